@@ -1,8 +1,10 @@
 import streamlit as st
-from langchain_core.messages import HumanMessage
 from langgraph.types import Command
 import uuid
-from graph import graph
+import os
+from graph import DEFAULT_TARGET_WORDS, DEFAULT_TONE, fork_thread, get_graph, llm_scheduler, metrics, new_blog_input
+from checkpointing import CHECKPOINT_DB, collect_blobs, prune
+from runner import GraphRun
 
 # Configure Streamlit page
 st.set_page_config(
@@ -12,6 +14,20 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource
+def load_graph():
+    """Compile the graph once per server process, on the first page load rather than at import"""
+    return get_graph()
+
+graph = load_graph()
+
+@st.cache_resource(ttl=3600)
+def apply_checkpoint_retention():
+    """Prune old checkpoints (in memory, only unused blobs) at most once an hour per server process"""
+    return prune(graph) if CHECKPOINT_DB else collect_blobs(graph.checkpointer)
+
+apply_checkpoint_retention()
+
 # Initialize session state
 if 'thread_id' not in st.session_state:
     st.session_state.thread_id = str(uuid.uuid4())
@@ -28,6 +44,147 @@ if 'awaiting_review' not in st.session_state:
 if 'blog_topic' not in st.session_state:
     st.session_state.blog_topic = ""
 
+if 'graph_run' not in st.session_state:
+    st.session_state.graph_run = None
+
+if 'node_progress' not in st.session_state:
+    st.session_state.node_progress = []
+
+if 'run_error' not in st.session_state:
+    st.session_state.run_error = None
+
+# How often the page polls a background graph run for progress
+POLL_SECONDS = 0.5
+
+NODE_LABELS = {
+    "input_node": "Topic extraction",
+    "research_node": "Research planning",
+    "tools": "Web search",
+    "multi_research": "Web search",
+    "extract_research": "Research extraction",
+    "outline_generator": "Outline generation",
+    "human_review": "Human review",
+    "revise_outline": "Outline revision",
+    "blog_generator": "Blog generation",
+    "section_writer": "Section writing",
+    "stitch_sections": "Section stitching",
+    "longform_writer": "Long-form writing",
+}
+
+def start_run(graph_input, running_step, label, error_step, error_prefix):
+    """Run the graph in the background for this session's thread and switch to the live view"""
+    thread_config = {"configurable": {"thread_id": st.session_state.thread_id, "priority": "interactive"}}
+    st.session_state.graph_run = GraphRun(graph_input, thread_config)
+    st.session_state.run_info = {"label": label, "error_step": error_step, "error_prefix": error_prefix}
+    st.session_state.current_step = running_step
+    st.session_state.awaiting_review = False
+    st.session_state.run_error = None
+    st.rerun()
+
+def finish_run(run):
+    """Move the session to the next step once the background run has ended"""
+    info = st.session_state.run_info
+    st.session_state.graph_run = None
+    st.session_state.node_progress = run.node_progress()
+
+    if run.error is not None:
+        if type(run.error).__name__ == "RateLimitError":
+            st.session_state.run_error = f"{info['error_prefix']}: the Groq rate limit is still exceeded after retrying. Please try again in a minute."
+        else:
+            st.session_state.run_error = f"{info['error_prefix']}: {str(run.error)}"
+        st.session_state.current_step = info["error_step"]
+        st.session_state.awaiting_review = info["error_step"] == "review"
+        return
+
+    result = run.result
+    st.session_state.blog_state = result
+    
+    # Check if we hit an interrupt (human review needed)
+    if '__interrupt__' in result:
+        st.session_state.current_step = "review"
+        st.session_state.awaiting_review = True
+    else:
+        st.session_state.current_step = "complete"
+
+running = st.session_state.graph_run is not None
+
+@st.fragment(run_every=POLL_SECONDS if running else None)
+def node_progress_panel():
+    """Per-node status and elapsed time, refreshed while a run is in progress"""
+    run = st.session_state.graph_run
+    progress = run.node_progress() if run else st.session_state.node_progress
+    if not progress:
+        return
+
+    st.subheader("⚙️ Live Progress" if run else "⏱️ Last Run")
+    for node, status, seconds in progress:
+        label = NODE_LABELS.get(node, node)
+        if status == "running":
+            st.markdown(f"⏳ **{label}** · {seconds:.1f}s")
+        elif status == "waiting":
+            st.markdown(f"👤 {label} · waiting")
+        else:
+            st.markdown(f"✅ {label} · {seconds:.1f}s")
+
+@st.fragment(run_every=POLL_SECONDS if running else None)
+def live_run_output():
+    """Streamed output of the background run; hands over to the next step when it ends"""
+    run = st.session_state.graph_run
+    if run is None:
+        return
+    if run.done:
+        finish_run(run)
+        st.rerun()
+
+    st.header(st.session_state.run_info["label"])
+    st.caption(f"⏱️ {run.elapsed():.1f}s elapsed")
+    queued = llm_scheduler.stats()["queued"]
+    if any(queued.values()):
+        st.caption(f"🚦 Waiting for LLM quota · {queued['interactive']} interactive, {queued['batch']} batch requests queued")
+    st.markdown(run.streamed_text() or "_Working on it..._")
+
+def run_metrics_panel():
+    """Time, token, cost and cache totals recorded for this session's thread"""
+    report = metrics.thread_report(st.session_state.thread_id)
+    if report is None:
+        return
+
+    st.divider()
+    st.subheader("📊 Run Metrics")
+    col_time, col_cost = st.columns(2)
+    col_time.metric("Node time", f"{report['seconds']:.1f}s")
+    col_cost.metric("Est. cost", f"${report['cost_usd']:.4f}")
+    col_tokens, col_cache = st.columns(2)
+    col_tokens.metric("Tokens", f"{report['prompt_tokens'] + report['completion_tokens']:,}")
+    lookups = report["cache_hits"] + report["cache_misses"]
+    col_cache.metric("Cache hits", f"{report['cache_hits']}/{lookups}")
+    st.caption(f"Revisions: {report['revisions']}")
+    scheduler = llm_scheduler.stats()
+    st.caption(
+        f"LLM quota: avg wait {scheduler['avg_wait_seconds']:.1f}s, "
+        f"max {scheduler['max_wait_seconds']:.1f}s, {scheduler['throttled']} rate-limit responses"
+    )
+
+    with st.expander("Per-node breakdown"):
+        st.dataframe(
+            [
+                {
+                    "node": NODE_LABELS.get(node, node),
+                    "model": counters["model"] or "",
+                    "runs": counters["runs"],
+                    "seconds": round(counters["seconds"], 2),
+                    "prompt tokens": counters["prompt_tokens"],
+                    "completion tokens": counters["completion_tokens"],
+                    "cached LLM calls": f"{counters['cached_calls']}/{counters['llm_calls']}",
+                }
+                for node, counters in report["nodes"].items()
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
+        for tool, counters in report["tools"].items():
+            st.caption(f"{tool}: {counters['calls']} calls, {counters['seconds']:.2f}s")
+
 # App title and description
 st.title("🤖 BlogBolt :  AI Blog Generator")
 st.markdown("Create comprehensive, well-researched blog posts with AI assistance and human oversight.")
@@ -65,13 +222,27 @@ with st.sidebar:
                 st.markdown(f"✅ {name}")
             else:
                 st.markdown(f"⏳ {name}")
+    
+    st.divider()
+    node_progress_panel()
+    
+    # Totals only change when a run finishes, so this is not part of the polling fragment
+    if not running:
+        run_metrics_panel()
 
 # Main content area
 col1, col2 = st.columns([2, 1])
 
 with col1:
+    if st.session_state.run_error:
+        st.error(st.session_state.run_error)
+    
+    # A graph run is in progress in the background
+    if running:
+        live_run_output()
+
     # Step 1: Topic Input
-    if st.session_state.current_step == "input":
+    elif st.session_state.current_step == "input":
         st.header("🎯 Enter Blog Topic")
         
         topic = st.text_input(
@@ -82,37 +253,13 @@ with col1:
         
         if st.button("🚀 Start Blog Generation", type="primary", disabled=not topic.strip()):
             st.session_state.blog_topic = topic
-            st.session_state.current_step = "research"
-            
-            # Create thread config
-            thread_config = {"configurable": {"thread_id": st.session_state.thread_id}}
-            
-            with st.spinner("🔍 Researching topic and generating outline..."):
-                try:
-                    # Start the graph execution
-                    result = graph.invoke({
-                        "messages": [HumanMessage(content=f"Write a blog about {topic}")],
-                        "blog_title": "",
-                        "research_notes": "",
-                        "outline": "",
-                        "blog_content": "",
-                        "approval": False,
-                        "feedback": ""
-                    }, config=thread_config)
-                    
-                    st.session_state.blog_state = result
-                    
-                    # Check if we hit an interrupt (human review needed)
-                    if '__interrupt__' in result:
-                        st.session_state.current_step = "review"
-                        st.session_state.awaiting_review = True
-                    else:
-                        st.session_state.current_step = "complete"
-                    
-                    st.rerun()
-                    
-                except Exception as e:
-                    st.error(f"An error occurred: {str(e)}")
+            start_run(
+                new_blog_input(topic),
+                running_step="research",
+                label="🔍 Researching topic and generating outline...",
+                error_step="input",
+                error_prefix="An error occurred"
+            )
 
     # Step 2: Human Review
     elif st.session_state.current_step == "review" and st.session_state.awaiting_review:
@@ -141,25 +288,16 @@ with col1:
             with col_approve:
                 if st.button("✅ Approve Outline", type="primary", use_container_width=True):
                     # Resume with approval
-                    thread_config = {"configurable": {"thread_id": st.session_state.thread_id}}
-                    
-                    with st.spinner("✍️ Generating blog content..."):
-                        try:
-                            result = graph.invoke(
-                                Command(resume={
-                                    "approved": True,
-                                    "feedback": ""
-                                }),
-                                config=thread_config
-                            )
-                            
-                            st.session_state.blog_state = result
-                            st.session_state.current_step = "complete"
-                            st.session_state.awaiting_review = False
-                            st.rerun()
-                            
-                        except Exception as e:
-                            st.error(f"Error generating blog: {str(e)}")
+                    start_run(
+                        Command(resume={
+                            "approved": True,
+                            "feedback": ""
+                        }),
+                        running_step="generate",
+                        label="✍️ Generating blog content...",
+                        error_step="review",
+                        error_prefix="Error generating blog"
+                    )
             
             with col_reject:
                 if st.button("❌ Request Revision", type="secondary", use_container_width=True):
@@ -180,25 +318,16 @@ with col1:
         
         with col_submit:
             if st.button("🔄 Submit Feedback", type="primary", disabled=not feedback.strip()):
-                thread_config = {"configurable": {"thread_id": st.session_state.thread_id}}
-                
-                with st.spinner("🔄 Revising outline based on your feedback..."):
-                    try:
-                        result = graph.invoke(
-                            Command(resume={
-                                "approved": False,
-                                "feedback": feedback
-                            }),
-                            config=thread_config
-                        )
-                        
-                        st.session_state.blog_state = result
-                        st.session_state.current_step = "review"
-                        st.session_state.awaiting_review = True
-                        st.rerun()
-                        
-                    except Exception as e:
-                        st.error(f"Error revising outline: {str(e)}")
+                start_run(
+                    Command(resume={
+                        "approved": False,
+                        "feedback": feedback
+                    }),
+                    running_step="outline",
+                    label="🔄 Revising outline based on your feedback...",
+                    error_step="feedback",
+                    error_prefix="Error revising outline"
+                )
         
         with col_back:
             if st.button("← Back to Review", type="secondary"):
@@ -221,16 +350,48 @@ with col1:
             # Display content in a nice format
             st.markdown(blog_content)
             
+            # Long-form documents stay on disk; only a pointer to them is in the state
+            output_path = st.session_state.blog_state.get('output_path')
+            if output_path and os.path.exists(output_path):
+                with open(output_path, "rb") as document:
+                    st.download_button(
+                        "⬇️ Download Document", document, file_name=os.path.basename(output_path),
+                        mime="text/markdown", use_container_width=True
+                    )
+            
             st.divider()
             
+            # Another take on the approved outline, without redoing research and outlining
+            with st.expander("🎨 Generate Another Take"):
+                tone = st.text_input("Tone", value=st.session_state.blog_state.get('tone') or DEFAULT_TONE)
+                target_words = st.text_input(
+                    "Length (words)", value=st.session_state.blog_state.get('target_words') or DEFAULT_TARGET_WORDS
+                )
+                if st.button("✍️ Rewrite From Approved Outline", use_container_width=True):
+                    try:
+                        fork = fork_thread(st.session_state.thread_id, {"tone": tone, "target_words": target_words})
+                    except ValueError as e:
+                        st.session_state.run_error = f"Error generating another take: {str(e)}"
+                        st.rerun()
+                    st.session_state.thread_id = fork["configurable"]["thread_id"]
+                    start_run(
+                        None,
+                        running_step="generate",
+                        label="✍️ Writing another take on the approved outline...",
+                        error_step="complete",
+                        error_prefix="Error generating another take"
+                    )
+            
             # Restart option
             if st.button("🔄 Generate New Blog", type="primary", use_container_width=True):
-                # Reset all session state
+                # Drop the finished thread's checkpoints, then reset all session state
+                graph.checkpointer.delete_thread(st.session_state.thread_id)
                 st.session_state.thread_id = str(uuid.uuid4())
                 st.session_state.blog_state = None
                 st.session_state.current_step = "input"
                 st.session_state.awaiting_review = False
                 st.session_state.blog_topic = ""
+                st.session_state.node_progress = []
                 st.rerun()
 
 # Right column - Information and tips
@@ -0,0 +1,117 @@
+import argparse
+import json
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from langgraph.types import Command
+from graph import get_graph, new_blog_input
+from checkpointing import CHECKPOINT_DB
+
+# A policy that keeps asking for revisions would loop forever; park the thread instead
+MAX_REVIEWS = 5
+
+def auto_approve(result):
+    """Approve every outline as generated"""
+    return {"approved": True, "feedback": ""}
+
+def park(result):
+    """Leave the thread waiting at human_review for someone to resume later"""
+    return None
+
+# Review policies take the interrupted graph result and return a resume payload, or None to park
+REVIEW_POLICIES = {
+    "approve": auto_approve,
+    "park": park,
+}
+
+def drive(graph_input, thread_id, policy):
+    """Run one thread until it completes, gets parked or fails, and describe the outcome"""
+    # Batch priority lets interactive sessions go first when the LLM quota is tight
+    config = {"configurable": {"thread_id": thread_id, "priority": "batch"}}
+    started = time.perf_counter()
+    record = {"thread_id": thread_id, "reviews": 0}
+    graph = get_graph()
+    try:
+        result = graph.invoke(graph_input, config=config)
+        status = "complete"
+        while "__interrupt__" in result:
+            decision = policy(result) if record["reviews"] < MAX_REVIEWS else None
+            if decision is None:
+                status = "parked"
+                break
+            record["reviews"] += 1
+            result = graph.invoke(Command(resume=decision), config=config)
+
+        record.update({
+            "status": status,
+            "blog_title": result.get("blog_title", ""),
+            "outline": result.get("outline", ""),
+            "blog_content": result.get("blog_content", ""),
+            "output_path": result.get("output_path", ""),
+        })
+    except Exception as e:
+        record.update({"status": "error", "error": str(e)})
+
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+def run_batch(jobs, output, concurrency):
+    """Run (label, graph_input, thread_id, policy) jobs on a worker pool, writing JSONL as each finishes"""
+    counts = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {
+            pool.submit(drive, graph_input, thread_id, policy): label
+            for label, graph_input, thread_id, policy in jobs
+        }
+        for future in as_completed(futures):
+            record = {"topic": futures[future], **future.result()}
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+            counts[record["status"]] = counts.get(record["status"], 0) + 1
+            print(f"[{record['status']}] {record['topic']} ({record['seconds']}s)", file=sys.stderr)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate blog posts for many topics")
+    parser.add_argument("topics", help="Text file with one topic per line, or a results JSONL with --resume-parked")
+    parser.add_argument("-o", "--output", default="-", help="JSONL results file (default: stdout)")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="Topics processed at the same time")
+    parser.add_argument("--policy", choices=sorted(REVIEW_POLICIES), default="approve",
+                        help="How to handle the outline review step")
+    parser.add_argument("--resume-parked", action="store_true",
+                        help="Approve the parked threads listed in a previous results file")
+    args = parser.parse_args()
+
+    if not CHECKPOINT_DB and (args.policy == "park" or args.resume_parked):
+        print("Warning: CHECKPOINT_DB is not set, parked threads only live as long as this process",
+              file=sys.stderr)
+
+    with open(args.topics, encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip()]
+
+    if args.resume_parked:
+        parked = [json.loads(line) for line in lines]
+        jobs = [
+            (record["topic"], Command(resume={"approved": True, "feedback": ""}), record["thread_id"], auto_approve)
+            for record in parked if record.get("status") == "parked"
+        ]
+    else:
+        batch_id = uuid.uuid4().hex[:8]
+        jobs = [
+            (topic, new_blog_input(topic), f"batch-{batch_id}-{index}", REVIEW_POLICIES[args.policy])
+            for index, topic in enumerate(lines)
+        ]
+
+    started = time.perf_counter()
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        counts = run_batch(jobs, output, args.concurrency)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Processed {len(jobs)} topics in {elapsed:.1f}s ({counts})", file=sys.stderr)
@@ -0,0 +1,381 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+# Offline by default: no response cache or research store to skew repeat runs, no quota to wait for, no metrics files,
+# dummy keys for client setup
+os.environ.setdefault("LLM_CACHE", "0")
+os.environ.setdefault("RESEARCH_STORE", "")
+os.environ.setdefault("LLM_REQUESTS_PER_MINUTE", "0")
+os.environ.setdefault("LLM_TOKENS_PER_MINUTE", "0")
+os.environ.setdefault("METRICS_LOG", "")
+os.environ.setdefault("METRICS_PROM_PATH", "")
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "offline-benchmark")
+
+from langgraph.types import Command
+import graph
+from batch import MAX_REVIEWS, drive
+from fakes import FakeChatModel, FakeSearch
+
+DEFAULT_OUTPUT_DIR = ".cache/bench"
+
+DEFAULT_FEEDBACK = "Add more recent statistics and a section on risks."
+
+def scripted(decisions, feedback=DEFAULT_FEEDBACK):
+    """Review policy that answers successive reviews of one thread with decisions ("approve"/"revise")"""
+    remaining = iter(decisions)
+
+    def policy(result):
+        if next(remaining, "approve") == "approve":
+            return {"approved": True, "feedback": ""}
+        return {"approved": False, "feedback": feedback}
+
+    return policy
+
+async def adrive(graph_input, thread_id, policy):
+    """Async counterpart of batch.drive on the event loop's async graph"""
+    config = {"configurable": {"thread_id": thread_id, "priority": "batch"}}
+    async_graph = await graph.get_async_graph()
+    started = time.perf_counter()
+    record = {"thread_id": thread_id, "reviews": 0}
+    try:
+        result = await async_graph.ainvoke(graph_input, config=config)
+        status = "complete"
+        while "__interrupt__" in result:
+            decision = policy(result) if record["reviews"] < MAX_REVIEWS else None
+            if decision is None:
+                status = "parked"
+                break
+            record["reviews"] += 1
+            result = await async_graph.ainvoke(Command(resume=decision), config=config)
+        record["status"] = status
+    except Exception as e:
+        record.update({"status": "error", "error": str(e)})
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+async def http_drive(client, topic, thread_id, policy):
+    """Drive one session through server.py: start it, follow its SSE stream and answer reviews"""
+    started = time.perf_counter()
+    record = {"thread_id": thread_id, "reviews": 0, "first_token_seconds": None}
+    try:
+        response = await client.post("/threads", json={"topic": topic, "thread_id": thread_id})
+        response.raise_for_status()
+        while True:
+            event = None
+            async with client.stream("GET", f"/threads/{thread_id}/stream") as stream:
+                async for line in stream.aiter_lines():
+                    if line.startswith("event: "):
+                        event = line[len("event: "):]
+                        if event == "token" and record["first_token_seconds"] is None:
+                            record["first_token_seconds"] = round(time.perf_counter() - started, 3)
+                    elif line.startswith("data: ") and event == "error":
+                        raise RuntimeError(json.loads(line[len("data: "):])["error"])
+            if event != "interrupt":
+                record["status"] = "complete"
+                break
+            decision = policy(None) if record["reviews"] < MAX_REVIEWS else None
+            if decision is None:
+                record["status"] = "parked"
+                break
+            record["reviews"] += 1
+            response = await client.post(f"/threads/{thread_id}/resume", json=decision)
+            response.raise_for_status()
+    except Exception as e:
+        record.update({"status": "error", "error": str(e)})
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+def percentile(values, pct):
+    """Nearest-rank percentile of values (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered), math.ceil(pct / 100 * len(ordered))) - 1)]
+
+def peak_rss_mb():
+    """Peak resident memory of the whole process so far, in MB; it never goes down between levels"""
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1)
+
+def run_http_level(url, concurrency, threads, script, run_id, feedback=DEFAULT_FEEDBACK):
+    """run_level for concurrent sessions against a running server.py; node times and memory are the server's"""
+    import httpx
+
+    async def run_all():
+        slots = asyncio.Semaphore(concurrency)
+        limits = httpx.Limits(max_connections=concurrency * 2)
+        async with httpx.AsyncClient(base_url=url, timeout=None, limits=limits) as client:
+            async def bounded(i):
+                async with slots:
+                    return await http_drive(
+                        client, f"benchmark topic c{concurrency}-{i}", f"bench-{run_id}-c{concurrency}-{i}", scripted(script, feedback)
+                    )
+
+            return await asyncio.gather(*(bounded(i) for i in range(threads)))
+
+    started = time.perf_counter()
+    records = asyncio.run(run_all())
+    wall = time.perf_counter() - started
+
+    completed = [r for r in records if r["status"] == "complete"]
+    latencies = [r["seconds"] for r in completed]
+    first_tokens = [r["first_token_seconds"] for r in completed if r["first_token_seconds"] is not None]
+    return {
+        "concurrency": concurrency,
+        "threads": threads,
+        "completed": len(completed),
+        "errors": sorted({r["error"] for r in records if r["status"] == "error"}),
+        "wall_seconds": round(wall, 3),
+        "throughput_per_minute": round(len(completed) / wall * 60, 2) if wall else 0.0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_mean": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "first_token_p50": percentile(first_tokens, 50),
+        "first_token_p95": percentile(first_tokens, 95),
+        "nodes": {},
+        "process_peak_rss_mb": None,
+        "rss_growth_mb": None,
+        "peak_traced_mb": None,
+    }
+
+def run_level(concurrency, threads, script, run_id, use_async, feedback=DEFAULT_FEEDBACK):
+    """Drive threads blogs with at most concurrency in flight and summarize latency, throughput and memory"""
+    # Topics repeat across runs so the fakes replay the same latencies, but differ between
+    # levels so the search cache never serves one level from another
+    jobs = [
+        (graph.new_blog_input(f"benchmark topic c{concurrency}-{i}"), f"bench-{run_id}-c{concurrency}-{i}", scripted(script, feedback))
+        for i in range(threads)
+    ]
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+    rss_before = peak_rss_mb()
+
+    started = time.perf_counter()
+    if use_async:
+        async def run_all():
+            slots = asyncio.Semaphore(concurrency)
+
+            async def bounded(job):
+                async with slots:
+                    return await adrive(*job)
+
+            try:
+                return await asyncio.gather(*(bounded(job) for job in jobs))
+            finally:
+                await graph.close_async_graph()
+
+        records = asyncio.run(run_all())
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            records = list(pool.map(lambda job: drive(*job), jobs))
+    wall = time.perf_counter() - started
+
+    completed = [r for r in records if r["status"] == "complete"]
+    latencies = [r["seconds"] for r in completed]
+    node_seconds = {}
+    node_tokens = {}
+    for record in completed:
+        report = graph.metrics.thread_report(record["thread_id"]) or {"nodes": {}}
+        for node, counters in report["nodes"].items():
+            node_seconds.setdefault(node, []).append(counters["seconds"])
+            node_tokens.setdefault(node, []).append(counters["prompt_tokens"] + counters["completion_tokens"])
+
+    return {
+        "concurrency": concurrency,
+        "threads": threads,
+        "completed": len(completed),
+        "errors": sorted({r["error"] for r in records if r["status"] == "error"}),
+        "wall_seconds": round(wall, 3),
+        "throughput_per_minute": round(len(completed) / wall * 60, 2) if wall else 0.0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_mean": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        # Per-thread time and LLM tokens in each node, summed over revision loops
+        "nodes": {
+            node: {
+                "p50": round(percentile(values, 50), 3),
+                "p95": round(percentile(values, 95), 3),
+                "tokens_p50": percentile(node_tokens[node], 50),
+            }
+            for node, values in node_seconds.items()
+        },
+        # ru_maxrss cannot be reset, so a level only shows how far it raised the process peak
+        "process_peak_rss_mb": (rss_after := peak_rss_mb()),
+        "rss_growth_mb": round(rss_after - rss_before, 1),
+        "peak_traced_mb": round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1) if tracing else None,
+    }
+
+# Run in a fresh interpreter: seconds to import graph, then to compile the graph on first use
+STARTUP_PROBE = """
+import json, time
+started = time.perf_counter()
+import graph
+imported = time.perf_counter()
+graph.get_graph()
+print(json.dumps({"import_seconds": imported - started, "first_graph_seconds": time.perf_counter() - imported}))
+"""
+
+def startup_times(runs):
+    """Median and best import and first-compile times of graph over runs fresh processes"""
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", STARTUP_PROBE], capture_output=True, text=True, check=True, env=os.environ
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        key: {
+            "median": round(statistics.median(s[key] for s in samples), 3),
+            "min": round(min(s[key] for s in samples), 3),
+        }
+        for key in ("import_seconds", "first_graph_seconds")
+    }
+
+def process_peak_rss(results):
+    """Peak RSS of a whole run in MB, or None for --http runs (older results stored it as peak_rss_mb)"""
+    peaks = [
+        level.get("process_peak_rss_mb", level.get("peak_rss_mb")) for level in results["levels"]
+    ]
+    peaks = [peak for peak in peaks if peak is not None]
+    return max(peaks) if peaks else None
+
+def compare(results, baseline):
+    """Print each level's change against the baseline run at the same concurrency"""
+    previous = {level["concurrency"]: level for level in baseline["levels"]}
+    print(f"\nAgainst baseline {baseline.get('started', '?')}:")
+    for level in results["levels"]:
+        base = previous.get(level["concurrency"])
+        if base is None:
+            continue
+        changes = []
+        for key in ("latency_p50", "latency_p95", "throughput_per_minute"):
+            if base.get(key) and level.get(key) is not None:
+                changes.append(f"{key} {(level[key] - base[key]) / base[key] * 100:+.1f}%")
+        print(f"  c={level['concurrency']:<4} " + ", ".join(changes))
+    # The RSS peak belongs to the whole run, so it is compared once rather than per level
+    peak, base_peak = process_peak_rss(results), process_peak_rss(baseline)
+    if peak is not None and base_peak:
+        print(f"  {'process peak rss':<20} {(peak - base_peak) / base_peak * 100:+.1f}%")
+    if results.get("startup") and baseline.get("startup"):
+        for key, times in results["startup"].items():
+            base = baseline["startup"][key]["median"]
+            if base:
+                print(f"  {key:<20} median {(times['median'] - base) / base * 100:+.1f}%")
+
+def print_level(level):
+    print(
+        f"c={level['concurrency']:<4} done {level['completed']}/{level['threads']}  "
+        f"p50 {level['latency_p50']:.2f}s  p95 {level['latency_p95']:.2f}s  "
+        f"{level['throughput_per_minute']:.1f} blogs/min"
+        + (
+            f"  process peak rss {level['process_peak_rss_mb']} MB (+{level['rss_growth_mb']} MB this level)"
+            if level["process_peak_rss_mb"] is not None else ""
+        )
+        + (f"  traced {level['peak_traced_mb']} MB" if level["peak_traced_mb"] is not None else "")
+        + (f"  first token p50 {level['first_token_p50']:.2f}s" if "first_token_p50" in level else "")
+    )
+    for node, times in level["nodes"].items():
+        print(f"    {node:<20} p50 {times['p50']:.3f}s  p95 {times['p95']:.3f}s  tokens p50 {times.get('tokens_p50', 0)}")
+    for error in level["errors"]:
+        print(f"    error: {error}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the blog graph offline against fake LLM and search backends")
+    parser.add_argument("-c", "--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("-n", "--threads", type=int, default=16, help="Blogs generated per concurrency level")
+    parser.add_argument("--script", default="revise,approve",
+                        help="Comma-separated review decisions per thread (approve/revise); unlisted reviews approve")
+    parser.add_argument("--feedback", default=DEFAULT_FEEDBACK, help="Feedback sent with every revise decision")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Drive the async graph on one event loop")
+    parser.add_argument("--http", metavar="URL",
+                        help="Drive sessions against a running `server.py --fake` instead of the in-process graph")
+    parser.add_argument("--llm-first-token-ms", type=float, default=300.0)
+    parser.add_argument("--llm-per-token-ms", type=float, default=2.0)
+    parser.add_argument("--llm-output-tokens", type=int, default=400, help="Mean reply length in tokens")
+    parser.add_argument("--search-latency-ms", type=float, default=400.0)
+    parser.add_argument("--search-content-chars", type=int, default=800, help="Mean page size per search result")
+    parser.add_argument("--spread", type=float, default=0.3, help="Lognormal sigma for latencies and sizes (0 is fixed)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Also report the Python heap peak via tracemalloc (slows the run)")
+    parser.add_argument("--startup", type=int, default=0, metavar="RUNS",
+                        help="Also time importing graph and its first compile over RUNS fresh processes")
+    parser.add_argument("-o", "--output", help=f"Results JSON (default: {DEFAULT_OUTPUT_DIR}/<timestamp>.json)")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    script = [decision.strip() for decision in args.script.split(",") if decision.strip()]
+    if any(decision not in ("approve", "revise") for decision in script):
+        parser.error("--script accepts only 'approve' and 'revise'")
+
+    # With --http the server runs its own fakes; these only serve the in-process graph
+    graph.use_backends(
+        chat=FakeChatModel(
+            seed=args.seed,
+            first_token_ms=args.llm_first_token_ms,
+            per_token_ms=args.llm_per_token_ms,
+            output_tokens=args.llm_output_tokens,
+            latency_spread=args.spread,
+            size_spread=args.spread,
+        ),
+        search=(search := FakeSearch(
+            seed=args.seed,
+            latency_ms=args.search_latency_ms,
+            latency_spread=args.spread,
+            content_chars=args.search_content_chars,
+            size_spread=args.spread,
+        )),
+        async_search=search.asearch,
+    )
+    if args.trace_memory:
+        tracemalloc.start()
+
+    run_id = time.strftime("%Y%m%d-%H%M%S")
+    results = {
+        "started": run_id,
+        "settings": {
+            **vars(args),
+            "generation_mode": graph.BLOG_GENERATION_MODE,
+            "research_mode": graph.RESEARCH_MODE,
+            "research_extraction": graph.RESEARCH_EXTRACTION,
+            "outline_revision": graph.OUTLINE_REVISION,
+            "checkpoint_db": bool(graph.CHECKPOINT_DB),
+        },
+        "levels": [],
+    }
+    if args.startup:
+        results["startup"] = startup_times(args.startup)
+        for key, times in results["startup"].items():
+            print(f"{key:<20} median {times['median']:.3f}s  min {times['min']:.3f}s")
+    for concurrency in (int(level) for level in args.concurrency.split(",")):
+        if args.http:
+            level = run_http_level(args.http, concurrency, args.threads, script, run_id, args.feedback)
+        else:
+            level = run_level(concurrency, args.threads, script, run_id, args.use_async, args.feedback)
+        results["levels"].append(level)
+        print_level(level)
+
+    output = args.output or os.path.join(DEFAULT_OUTPUT_DIR, f"{run_id}.json")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            compare(results, json.load(f))
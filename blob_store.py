@@ -0,0 +1,222 @@
+import dataclasses
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_core.messages import BaseMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.types import Interrupt, Send
+
+# A stored value is replaced by {BLOB_KEY: digest} inside the checkpoint
+BLOB_KEY = "__checkpoint_blob__"
+
+
+class BlobStore:
+    """Content-addressed store of serialized values, in memory or in a SQLite table.
+
+    Blobs are keyed by the SHA-256 of their serialized form, so a value that
+    appears in many checkpoints is stored once. With a path, recently read
+    blobs are kept in an LRU of at most cache_bytes.
+    """
+
+    def __init__(self, path=None, cache_bytes=32 * 2 ** 20):
+        self.path = path
+        self.cache_bytes = cache_bytes
+        self._cache = OrderedDict()  # digest -> (type, data); the whole store when in memory
+        self._cached_bytes = 0
+        self._created = {}  # digest -> time stored, for the in-memory store
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            with self._lock, self._conn:
+                self._conn.execute(
+                    """CREATE TABLE IF NOT EXISTS checkpoint_blobs (
+                        digest TEXT PRIMARY KEY,
+                        type TEXT NOT NULL,
+                        data BLOB NOT NULL,
+                        created_at REAL NOT NULL
+                    )"""
+                )
+
+    @staticmethod
+    def digest(type_, data):
+        return hashlib.sha256(type_.encode("utf-8") + b"\x00" + data).hexdigest()
+
+    def _remember(self, digest, blob):
+        """Keep blob in the LRU; caller holds the lock"""
+        if digest in self._cache:
+            self._cache.move_to_end(digest)
+            return
+        self._cache[digest] = blob
+        self._cached_bytes += len(blob[1])
+        while self._conn is not None and self._cached_bytes > self.cache_bytes and len(self._cache) > 1:
+            self._cached_bytes -= len(self._cache.popitem(last=False)[1][1])
+
+    def put(self, type_, data):
+        """Store a blob, or mark an already stored one as just written; returns its digest"""
+        digest = self.digest(type_, data)
+        self.put_many({digest: (type_, data)})
+        return digest
+
+    def put_many(self, blobs):
+        """Store {digest: (type, data)} blobs in one transaction.
+
+        Reusing a blob refreshes its timestamp even when it is cached, so it
+        gets collect()'s full grace period while the checkpoint referencing it
+        is saved, and a copy deleted by another process is written back.
+        """
+        now = time.time()
+        with self._lock:
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.executemany(
+                        """INSERT INTO checkpoint_blobs (digest, type, data, created_at) VALUES (?, ?, ?, ?)
+                        ON CONFLICT (digest) DO UPDATE SET created_at = excluded.created_at""",
+                        ((digest, type_, data, now) for digest, (type_, data) in blobs.items()),
+                    )
+            for digest, blob in blobs.items():
+                if self._conn is None:
+                    self._created[digest] = now
+                self._remember(digest, blob)
+
+    def get(self, digest):
+        with self._lock:
+            blob = self._cache.get(digest)
+            if blob is None and self._conn is not None:
+                row = self._conn.execute("SELECT type, data FROM checkpoint_blobs WHERE digest = ?", (digest,)).fetchone()
+                blob = (row[0], bytes(row[1])) if row else None
+            if blob is None:
+                raise KeyError(f"Checkpoint blob {digest} is missing")
+            self._remember(digest, blob)
+        return blob
+
+    def collect(self, referenced, grace_seconds=600):
+        """Delete blobs not in referenced, sparing ones stored in the last grace_seconds.
+
+        The grace period covers blobs written for a checkpoint that is still
+        being saved. Returns the number of blobs deleted.
+        """
+        cutoff = time.time() - grace_seconds
+        with self._lock:
+            if self._conn is None:
+                stale = [d for d, created in self._created.items() if d not in referenced and created < cutoff]
+            else:
+                stale = [
+                    d for (d,) in self._conn.execute("SELECT digest FROM checkpoint_blobs WHERE created_at < ?", (cutoff,))
+                    if d not in referenced
+                ]
+                with self._conn:
+                    self._conn.executemany("DELETE FROM checkpoint_blobs WHERE digest = ?", ((d,) for d in stale))
+            for digest in stale:
+                self._created.pop(digest, None)
+                blob = self._cache.pop(digest, None)
+                if blob is not None:
+                    self._cached_bytes -= len(blob[1])
+        return len(stale)
+
+    def stats(self):
+        with self._lock:
+            if self._conn is None:
+                return {"blobs": len(self._cache), "bytes": self._cached_bytes}
+            count, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM checkpoint_blobs").fetchone()
+        return {"blobs": count, "bytes": size}
+
+
+class BlobSerializer:
+    """Checkpoint serializer that moves large strings and messages into a BlobStore.
+
+    Wraps LangGraph's JsonPlusSerializer: before a checkpoint or pending write
+    (including interrupt payloads and Send packets) is serialized, every string
+    of at least min_bytes and every message whose serialized form is at least
+    min_bytes is stored once in the blob store and replaced by a reference.
+    References are resolved when a checkpoint is read, fetching blobs through
+    the store's LRU, so storage per thread grows with unique content rather
+    than with the number of checkpoints. All blobs of one value are written in
+    a single transaction.
+    """
+
+    def __init__(self, store, min_bytes=1024, inner=None):
+        self.store = store
+        self.min_bytes = min_bytes
+        self.inner = inner or JsonPlusSerializer()
+
+    def _stash(self, type_, data, pending):
+        digest = self.store.digest(type_, data)
+        pending[digest] = (type_, data)
+        return {BLOB_KEY: digest}
+
+    def _extract(self, value, pending):
+        """value with large strings and messages replaced by references; their blobs are added to pending"""
+        if isinstance(value, str):
+            if len(value) < self.min_bytes:
+                return value
+            return self._stash(*self.inner.dumps_typed(value), pending)
+        if isinstance(value, BaseMessage):
+            type_, data = self.inner.dumps_typed(value)
+            return self._stash(type_, data, pending) if len(data) >= self.min_bytes else value
+        # Only plain containers, review payloads and fan-out packets; anything else is left to the inner serializer
+        if type(value) is dict:
+            return {key: self._extract(item, pending) for key, item in value.items()}
+        if type(value) in (list, tuple):
+            return type(value)(self._extract(item, pending) for item in value)
+        if isinstance(value, Interrupt):
+            return dataclasses.replace(value, value=self._extract(value.value, pending))
+        if isinstance(value, Send):
+            return Send(value.node, self._extract(value.arg, pending))
+        return value
+
+    def extract(self, obj):
+        """Store obj's large values and return it with references in their place.
+
+        References are left as they are, so dumps_typed on the result writes
+        nothing; async savers call this in a worker thread first.
+        """
+        pending = {}
+        value = self._extract(obj, pending)
+        if pending:
+            self.store.put_many(pending)
+        return value
+
+    def _hydrate(self, value):
+        if type(value) is dict:
+            if len(value) == 1 and BLOB_KEY in value:
+                return self.inner.loads_typed(self.store.get(value[BLOB_KEY]))
+            return {key: self._hydrate(item) for key, item in value.items()}
+        if type(value) in (list, tuple):
+            return type(value)(self._hydrate(item) for item in value)
+        if isinstance(value, Interrupt):
+            return dataclasses.replace(value, value=self._hydrate(value.value))
+        if isinstance(value, Send):
+            return Send(value.node, self._hydrate(value.arg))
+        return value
+
+    def dumps_typed(self, obj):
+        return self.inner.dumps_typed(self.extract(obj))
+
+    def loads_typed(self, data):
+        return self._hydrate(self.inner.loads_typed(data))
+
+    def references(self, data):
+        """Digests referenced by one serialized (type, bytes) payload, without hydrating it"""
+        found = set()
+
+        def walk(value):
+            if type(value) is dict:
+                if len(value) == 1 and BLOB_KEY in value:
+                    found.add(value[BLOB_KEY])
+                    return
+                for item in value.values():
+                    walk(item)
+            elif type(value) in (list, tuple):
+                for item in value:
+                    walk(item)
+            elif isinstance(value, Interrupt):
+                walk(value.value)
+            elif isinstance(value, Send):
+                walk(value.arg)
+
+        walk(self.inner.loads_typed(data))
+        return found
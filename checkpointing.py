@@ -0,0 +1,185 @@
+import argparse
+import asyncio
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from langgraph.checkpoint.memory import MemorySaver
+from dotenv import load_dotenv
+
+from blob_store import BlobSerializer, BlobStore
+
+load_dotenv()
+
+# Empty keeps checkpoints in memory; a path stores them in SQLite and survives restarts
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", "")
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "20"))
+CHECKPOINT_IDLE_HOURS = float(os.getenv("CHECKPOINT_IDLE_HOURS", "168"))
+CHECKPOINT_COMPLETED_HOURS = float(os.getenv("CHECKPOINT_COMPLETED_HOURS", "24"))
+# Strings and messages at least this large are stored once per unique value instead of in every
+# checkpoint; 0 turns the blob store off
+CHECKPOINT_BLOB_MIN_BYTES = int(os.getenv("CHECKPOINT_BLOB_MIN_BYTES", "1024"))
+CHECKPOINT_BLOB_CACHE_MB = float(os.getenv("CHECKPOINT_BLOB_CACHE_MB", "32"))
+
+# path -> BlobSerializer, so the sync and async savers of one database share a blob store
+_blob_serializers = {}
+
+def blob_serializer(path=CHECKPOINT_DB):
+    """Serializer storing large checkpoint values in a blob store next to the checkpoints, or None if disabled"""
+    if not CHECKPOINT_BLOB_MIN_BYTES:
+        return None
+    if path not in _blob_serializers:
+        store = BlobStore(path or None, cache_bytes=int(CHECKPOINT_BLOB_CACHE_MB * 2 ** 20))
+        _blob_serializers[path] = BlobSerializer(store, min_bytes=CHECKPOINT_BLOB_MIN_BYTES)
+    return _blob_serializers[path]
+
+def make_checkpointer(path=CHECKPOINT_DB):
+    """Return a SqliteSaver for path, or a MemorySaver when no path is configured"""
+    if not path:
+        return MemorySaver(serde=blob_serializer(path))
+
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    saver = SqliteSaver(sqlite3.connect(path, check_same_thread=False), serde=blob_serializer(path))
+    saver.setup()
+    return saver
+
+def blob_async_saver_class():
+    """AsyncSqliteSaver that writes a checkpoint's blobs in a worker thread before saving it.
+
+    AsyncSqliteSaver serializes on the event loop, and BlobSerializer's blob
+    writes are blocking SQLite commits.
+    """
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    class BlobAsyncSqliteSaver(AsyncSqliteSaver):
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            if isinstance(self.serde, BlobSerializer):
+                checkpoint = await asyncio.to_thread(self.serde.extract, checkpoint)
+            return await super().aput(config, checkpoint, metadata, new_versions)
+
+        async def aput_writes(self, config, writes, task_id, task_path=""):
+            if isinstance(self.serde, BlobSerializer):
+                writes = await asyncio.to_thread(self.serde.extract, [tuple(write) for write in writes])
+            return await super().aput_writes(config, writes, task_id, task_path)
+
+    return BlobAsyncSqliteSaver
+
+async def make_async_checkpointer(path=CHECKPOINT_DB):
+    """AsyncSqliteSaver for path; must be awaited inside the event loop that will use it"""
+    import aiosqlite
+
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    saver = blob_async_saver_class()(await aiosqlite.connect(path), serde=blob_serializer(path))
+    await saver.setup()
+    return saver
+
+def prune(graph, keep_last=CHECKPOINT_KEEP_LAST, idle_hours=CHECKPOINT_IDLE_HOURS,
+          completed_hours=CHECKPOINT_COMPLETED_HOURS):
+    """Apply the retention policy to a graph compiled with a SqliteSaver.
+
+    Threads whose blog is finished are deleted after completed_hours, threads
+    with no activity (including outlines still waiting for review) after
+    idle_hours. Surviving threads keep only their keep_last newest checkpoints.
+    Returns a dict with the number of deleted threads and checkpoints.
+    """
+    saver = graph.checkpointer
+    now = time.time()
+    removed = {"threads": 0, "checkpoints": 0}
+
+    with saver.cursor() as cur:
+        thread_ids = [row[0] for row in cur.execute("SELECT DISTINCT thread_id FROM checkpoints")]
+
+    for thread_id in thread_ids:
+        config = {"configurable": {"thread_id": thread_id}}
+        latest = saver.get_tuple(config)
+        if latest is None:
+            continue
+        age_hours = (now - datetime.fromisoformat(latest.checkpoint["ts"]).timestamp()) / 3600
+        finished = not graph.get_state(config).next
+
+        if age_hours > idle_hours or (finished and age_hours > completed_hours):
+            saver.delete_thread(thread_id)
+            removed["threads"] += 1
+            continue
+
+        if keep_last:
+            with saver.cursor() as cur:
+                cur.execute(
+                    """DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_id NOT IN (
+                        SELECT checkpoint_id FROM checkpoints WHERE thread_id = ?
+                        ORDER BY checkpoint_id DESC LIMIT ?
+                    )""",
+                    (thread_id, thread_id, keep_last),
+                )
+                removed["checkpoints"] += cur.rowcount
+                # Pending writes belong to a checkpoint; drop the ones left without one
+                cur.execute(
+                    """DELETE FROM writes WHERE thread_id = ? AND checkpoint_id NOT IN (
+                        SELECT checkpoint_id FROM checkpoints WHERE thread_id = ?
+                    )""",
+                    (thread_id, thread_id),
+                )
+
+    removed["blobs"] = collect_blobs(saver)
+    return removed
+
+def collect_blobs(saver, grace_seconds=600):
+    """Delete blobs no checkpoint or pending write refers to any more; returns how many"""
+    serde = saver.serde
+    if not isinstance(serde, BlobSerializer):
+        return 0
+
+    if isinstance(saver, MemorySaver):
+        # The graph may be writing to these dicts meanwhile. dict.copy() holds the GIL for the whole
+        # copy, so snapshot every level before looping over it; entries added after the snapshot
+        # only reference blobs that are still within the grace period.
+        payloads = [
+            typed
+            for namespaces in saver.storage.copy().values()
+            for checkpoints in namespaces.copy().values()
+            for checkpoint, metadata, _ in checkpoints.copy().values()
+            for typed in (checkpoint, metadata)
+        ]
+        payloads += list(saver.blobs.copy().values())
+        payloads += [write[2] for writes in saver.writes.copy().values() for write in writes.copy().values()]
+    else:
+        with saver.cursor(transaction=False) as cur:
+            payloads = cur.execute("SELECT type, checkpoint FROM checkpoints").fetchall()
+            payloads += cur.execute("SELECT type, value FROM writes").fetchall()
+
+    referenced = set()
+    for type_, data in payloads:
+        if type_ != "empty":
+            referenced |= serde.references((type_, bytes(data)))
+    return serde.store.collect(referenced, grace_seconds)
+
+def compact(saver):
+    """Reclaim the space freed by pruning from the SQLite file"""
+    with saver.cursor(transaction=False) as cur:
+        cur.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        cur.execute("VACUUM")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the SQLite checkpoint database")
+    parser.add_argument("command", choices=["prune", "compact"])
+    parser.add_argument("--keep-last", type=int, default=CHECKPOINT_KEEP_LAST)
+    parser.add_argument("--idle-hours", type=float, default=CHECKPOINT_IDLE_HOURS)
+    parser.add_argument("--completed-hours", type=float, default=CHECKPOINT_COMPLETED_HOURS)
+    args = parser.parse_args()
+
+    if not CHECKPOINT_DB:
+        parser.error("CHECKPOINT_DB is not set; in-memory checkpoints need no maintenance")
+
+    from graph import graph
+
+    if args.command == "prune":
+        removed = prune(graph, args.keep_last, args.idle_hours, args.completed_hours)
+        print(f"Removed {removed['threads']} threads, {removed['checkpoints']} old checkpoints and {removed['blobs']} blobs")
+    compact(graph.checkpointer)
+    print(f"Compacted {CHECKPOINT_DB}")
@@ -0,0 +1,72 @@
+import os
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "60"))
+# Retries on 429 and 5xx; the Groq SDK backs off exponentially with jitter and honours Retry-After
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+
+# Callables notified with (host, retry_after seconds or None) whenever a request is rate limited
+rate_limit_listeners = []
+
+def _retry_after(headers):
+    try:
+        return float(headers.get("retry-after", ""))
+    except ValueError:
+        return None
+
+def _check_rate_limit(response):
+    if response.status_code == 429:
+        for listener in rate_limit_listeners:
+            listener(response.request.url.host, _retry_after(response.headers))
+
+async def _acheck_rate_limit(response):
+    _check_rate_limit(response)
+
+# One connection pool per process, shared by every Groq and Tavily request.
+# The async client belongs to the event loop that first uses it, so async
+# traffic should be served from a single loop.
+limits = httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS // 4)
+http_client = httpx.Client(
+    limits=limits, timeout=HTTP_TIMEOUT_SECONDS, event_hooks={"response": [_check_rate_limit]}
+)
+http_async_client = httpx.AsyncClient(
+    limits=limits, timeout=HTTP_TIMEOUT_SECONDS, event_hooks={"response": [_acheck_rate_limit]}
+)
+
+def chat_model(model, **kwargs):
+    """ChatGroq model that sends its requests through the shared connection pools"""
+    # Imported on first use; the Groq SDK is only needed once a model is actually built
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(
+        model=model, http_client=http_client, http_async_client=http_async_client, max_retries=LLM_MAX_RETRIES, **kwargs
+    )
+
+def _tavily_request(query, max_results):
+    return {
+        "json": {"query": query, "max_results": max_results, "search_depth": "advanced"},
+        "headers": {"Authorization": f"Bearer {os.environ['TAVILY_API_KEY']}"},
+    }
+
+def _clean_results(payload):
+    """Keep the same result fields as LangChain's Tavily tool"""
+    return [
+        {"title": r.get("title", ""), "url": r["url"], "content": r.get("content", ""), "score": r.get("score", 0)}
+        for r in payload.get("results", [])
+    ]
+
+def tavily_search(query, max_results=3):
+    response = http_client.post(TAVILY_SEARCH_URL, **_tavily_request(query, max_results))
+    response.raise_for_status()
+    return _clean_results(response.json())
+
+async def atavily_search(query, max_results=3):
+    response = await http_async_client.post(TAVILY_SEARCH_URL, **_tavily_request(query, max_results))
+    response.raise_for_status()
+    return _clean_results(response.json())
@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import math
+import random
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+WORDS = (
+    "market growth data model trend revenue platform chip demand supply research report analysts "
+    "quarter customers adoption energy efficiency cloud investment risk policy performance launch"
+).split()
+
+def lognormal(rng, mean, spread):
+    """Sample with the given mean; spread is the sigma of the underlying normal (0 means fixed)"""
+    if mean <= 0 or spread <= 0:
+        return max(mean, 0)
+    return rng.lognormvariate(math.log(mean) - spread ** 2 / 2, spread)
+
+def seeded_rng(seed, *parts):
+    """Random generator determined by seed and parts, so equal inputs give equal outputs"""
+    digest = hashlib.sha256("\x00".join(map(str, (seed, *parts))).encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+def words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(max(1, count)))
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic offline stand-in for the Groq chat model.
+
+    Replies are shaped after the prompt (a short title for topic extraction, a
+    markdown outline for outline and revision prompts, a tool call when tools
+    are bound, prose otherwise) with lognormally distributed latency and
+    length. The same prompt and seed always give the same reply and latency.
+    Latency is time to first token plus a per-token cost, slept for real.
+    """
+
+    model_name: str = "fake"
+    seed: int = 0
+    first_token_ms: float = 300.0
+    per_token_ms: float = 2.0
+    latency_spread: float = 0.3
+    output_tokens: int = 400
+    outline_sections: int = 5
+    size_spread: float = 0.3
+    tools: list = []
+
+    @property
+    def _llm_type(self):
+        return "fake-chat"
+
+    @property
+    def _identifying_params(self):
+        return {"model_name": self.model_name, "seed": self.seed, "output_tokens": self.output_tokens}
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={"tools": list(tools)})
+
+    def _reply(self, messages):
+        """(message, seconds to first token, seconds per token) for a prompt"""
+        prompt = messages[-1].content if messages else ""
+        rng = seeded_rng(self.seed, prompt, bool(self.tools))
+        tokens = int(lognormal(rng, self.output_tokens, self.size_spread))
+
+        if self.tools:
+            tool_call = {"name": self.tools[0].name, "args": {"query": words(rng, 6)}, "id": f"call_{rng.getrandbits(32):08x}"}
+            message = AIMessage(content="", tool_calls=[tool_call])
+            tokens = 20
+        elif prompt.startswith("Given the user input"):
+            quoted = prompt.split('"')[1] if prompt.count('"') >= 2 else words(rng, 4)
+            message = AIMessage(content=quoted.removeprefix("Write a blog about ").strip())
+            tokens = 10
+        elif "Revise only this section" in prompt:
+            # The section under revision follows the instruction line; keep its heading
+            section = prompt.split("keeping its heading and format:\n", 1)[-1]
+            tokens = max(20, tokens // self.outline_sections)
+            bullets = "\n".join(f"- {words(rng, 6)}" for _ in range(max(1, tokens // 8)))
+            message = AIMessage(content=f"{section.splitlines()[0]}\n{bullets}")
+        elif "blog outline" in prompt or "The current outline was not approved" in prompt:
+            per_section = max(1, tokens // (self.outline_sections * 8))
+            sections = "\n\n".join(
+                f"## {i}. {words(rng, 3).title()}\n" + "\n".join(f"- {words(rng, 6)}" for _ in range(per_section))
+                for i in range(1, self.outline_sections + 1)
+            )
+            message = AIMessage(content=f"# {words(rng, 4).title()}\n\n{sections}")
+        else:
+            message = AIMessage(content=words(rng, tokens))
+
+        message.usage_metadata = {
+            "input_tokens": len(prompt) // 4,
+            "output_tokens": tokens,
+            "total_tokens": len(prompt) // 4 + tokens,
+        }
+        first_token = lognormal(rng, self.first_token_ms, self.latency_spread) / 1000
+        return message, first_token, self.per_token_ms / 1000
+
+    def _chunks(self, message):
+        if message.tool_calls or not message.content:
+            yield AIMessageChunk(content=message.content, tool_calls=message.tool_calls, usage_metadata=message.usage_metadata)
+            return
+        pieces = message.content.split(" ")
+        for i, piece in enumerate(pieces):
+            last = i == len(pieces) - 1
+            yield AIMessageChunk(
+                content=piece if last else piece + " ",
+                usage_metadata=message.usage_metadata if last else None,
+            )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        message, first_token, per_token = self._reply(messages)
+        time.sleep(first_token + per_token * message.usage_metadata["output_tokens"])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        message, first_token, per_token = self._reply(messages)
+        await asyncio.sleep(first_token + per_token * message.usage_metadata["output_tokens"])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        message, first_token, per_token = self._reply(messages)
+        time.sleep(first_token)
+        for chunk in self._chunks(message):
+            time.sleep(per_token)
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager:
+                run_manager.on_llm_new_token(generation.text, chunk=generation)
+            yield generation
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        message, first_token, per_token = self._reply(messages)
+        await asyncio.sleep(first_token)
+        for chunk in self._chunks(message):
+            await asyncio.sleep(per_token)
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager:
+                await run_manager.on_llm_new_token(generation.text, chunk=generation)
+            yield generation
+
+
+class FakeSearch:
+    """Deterministic offline stand-in for Tavily search with configurable latency and page size.
+
+    Call it like clients.tavily_search, or await asearch like atavily_search.
+    """
+
+    def __init__(self, seed=0, latency_ms=400.0, latency_spread=0.3, content_chars=800, size_spread=0.5):
+        self.seed = seed
+        self.latency_ms = latency_ms
+        self.latency_spread = latency_spread
+        self.content_chars = content_chars
+        self.size_spread = size_spread
+        self.calls = 0
+
+    def _results(self, query, max_results):
+        self.calls += 1
+        rng = seeded_rng(self.seed, query, max_results)
+        results = [
+            {
+                "title": words(rng, 5).title(),
+                "url": f"https://example.com/{hashlib.sha1(query.encode('utf-8')).hexdigest()[:8]}/{i}",
+                "content": words(rng, int(lognormal(rng, self.content_chars, self.size_spread)) // 7),
+                "score": round(rng.uniform(0.3, 1.0), 3),
+            }
+            for i in range(max_results)
+        ]
+        return results, lognormal(rng, self.latency_ms, self.latency_spread) / 1000
+
+    def __call__(self, query, max_results=3):
+        results, seconds = self._results(query, max_results)
+        time.sleep(seconds)
+        return results
+
+    async def asearch(self, query, max_results=3):
+        results, seconds = self._results(query, max_results)
+        await asyncio.sleep(seconds)
+        return results
@@ -0,0 +1,68 @@
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from graph import VARIANT_KEYS, WRITER_NODES, fork_thread, variant_values
+from batch import auto_approve, drive
+from checkpointing import CHECKPOINT_DB
+
+def parse_variant(spec):
+    """Validated state overrides from "key=value;key=value", e.g. "tone=witty;target_words=1500-2000" """
+    values = {}
+    for item in filter(None, (part.strip() for part in spec.split(";"))):
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"Invalid variant setting {item!r}; use key=value with one of {', '.join(VARIANT_KEYS)}")
+        values[key.strip()] = value
+    return variant_values(values)
+
+def run_variants(thread_id, variants, before=WRITER_NODES, concurrency=4):
+    """Fork thread_id once per variant and run all forks concurrently; yields one record per finished fork"""
+    forks = [(values, fork_thread(thread_id, values, before=before)) for values in variants]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {
+            # Forks taken before human_review approve whatever outline they end up with
+            pool.submit(drive, None, config["configurable"]["thread_id"], auto_approve): values
+            for values, config in forks
+        }
+        for future in as_completed(futures):
+            yield {"source_thread_id": thread_id, "variant": futures[future], **future.result()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Regenerate a thread from a checkpoint with different settings, without redoing upstream steps"
+    )
+    parser.add_argument("thread_id", help="Thread to fork, e.g. one listed in a batch results file")
+    parser.add_argument("-v", "--variant", action="append", required=True,
+                        help='State overrides for one fork, e.g. "tone=witty;target_words=1500-2000"; repeat for more')
+    parser.add_argument("--before", default=",".join(WRITER_NODES),
+                        help="Fork from the newest checkpoint about to run one of these comma-separated nodes "
+                             "(default: the approved outline)")
+    parser.add_argument("-o", "--output", default="-", help="JSONL results file (default: stdout)")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="Variants generated at the same time")
+    args = parser.parse_args()
+
+    if not CHECKPOINT_DB:
+        parser.error("CHECKPOINT_DB is not set; only threads stored in SQLite can be forked from the command line")
+    try:
+        variants = [parse_variant(spec) for spec in args.variant]
+    except ValueError as e:
+        parser.error(str(e))
+
+    started = time.perf_counter()
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        for record in run_variants(args.thread_id, variants, tuple(args.before.split(",")), args.concurrency):
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+            print(f"[{record['status']}] {record['thread_id']} {record['variant']} ({record['seconds']}s)", file=sys.stderr)
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(f"Generated {len(variants)} variants in {time.perf_counter() - started:.1f}s", file=sys.stderr)
@@ -1,61 +1,428 @@
-from langchain_community.tools import TavilySearchResults
-from langchain_groq import ChatGroq
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage, message_chunk_to_message
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langgraph.graph import StateGraph, START, END
 from langgraph.prebuilt import ToolNode, tools_condition
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.types import interrupt, Command
+from langgraph.types import interrupt, Command, Send
+from langgraph.config import get_config
+from langgraph.constants import TAG_NOSTREAM
 from typing_extensions import Annotated, List, TypedDict
 from langgraph.graph.message import add_messages
 from dotenv import load_dotenv
+from outline import feedback_targets, parse_sections, replace_sections
+from llm_cache import SQLiteLRUCache
+from search_cache import SearchCache
+from research_store import RESEARCH_STORE_MAX_AGE_HOURS, RESEARCH_STORE_PATH, ResearchStore
+from checkpointing import CHECKPOINT_DB, make_async_checkpointer, make_checkpointer
+from research import arun_queries, dedupe_and_rank, expand_queries, format_results, run_queries
+from clients import atavily_search, chat_model, rate_limit_listeners, tavily_search
+from speculative import SpeculativeDrafts
+from metrics import GraphMetrics
+from scheduler import LLMScheduler
+import asyncio
+import operator
+import os
+import re
+import threading
+import uuid
+import weakref
 
 load_dotenv()
 
+# "single" writes the post in one LLM call, "sections" writes each outline section in parallel,
+# "longform" writes a long document part by part into a markdown file under LONGFORM_DIR
+BLOG_GENERATION_MODE = os.getenv("BLOG_GENERATION_MODE", "single")
+SECTION_CONCURRENCY = int(os.getenv("BLOG_SECTION_CONCURRENCY", "4"))
+
+# Long-form prompts hold a rolling summary and the end of the previous part instead of the text written so far,
+# so prompt size, per-call latency and memory stay flat however long the document gets
+LONGFORM_DIR = os.getenv("LONGFORM_DIR", "output")
+LONGFORM_PART_WORDS = int(os.getenv("LONGFORM_PART_WORDS", "1000"))
+LONGFORM_SUMMARY_WORDS = int(os.getenv("LONGFORM_SUMMARY_WORDS", "300"))
+LONGFORM_TAIL_CHARS = int(os.getenv("LONGFORM_TAIL_CHARS", "1200"))
+# The async writer hands streamed text to the file in batches of about this size
+LONGFORM_FLUSH_CHARS = int(os.getenv("LONGFORM_FLUSH_CHARS", "2000"))
+
+# Draft the blog in the background while the outline waits for review (single mode only)
+SPECULATIVE_DRAFTS = os.getenv("SPECULATIVE_DRAFTS", "0") == "1" and BLOG_GENERATION_MODE == "single"
+
+# Response cache; creative nodes are left out of LLM_CACHE_NODES so they always produce fresh text
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_NODES = set(os.getenv(
+    "LLM_CACHE_NODES", "input_node,research_node,extract_research,outline_generator"
+).split(","))
+
+# How long Tavily results for the same query are reused
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", "900"))
+
+# "agent" lets the LLM issue one search, "multi" runs several sub-queries concurrently
+RESEARCH_MODE = os.getenv("RESEARCH_MODE", "agent")
+RESEARCH_CONCURRENCY = int(os.getenv("RESEARCH_CONCURRENCY", "3"))
+RESEARCH_MAX_RESULTS = int(os.getenv("RESEARCH_MAX_RESULTS", "8"))
+
+# Take the topic from templated requests and issue the agent's search without asking the LLM;
+# anything else falls back to the LLM calls
+FAST_PATH = os.getenv("FAST_PATH", "0") == "1"
+
+# Per-node model routing: cheap, latency-sensitive steps on a small model, the final post on a strong one.
+# NODE_MODELS ("node=model,...") or config["configurable"]["models"] override single nodes.
+LLM_MODEL = os.getenv("LLM_MODEL", "gemma2-9b-It")
+LLM_FAST_MODEL = os.getenv("LLM_FAST_MODEL", "llama-3.1-8b-instant")
+LLM_STRONG_MODEL = os.getenv("LLM_STRONG_MODEL", "llama-3.3-70b-versatile")
+NODE_MODELS = {
+    "input_node": LLM_FAST_MODEL,
+    "research_node": LLM_FAST_MODEL,
+    "extract_research": LLM_MODEL,
+    "outline_generator": LLM_MODEL,
+    "revise_outline": LLM_MODEL,
+    "blog_generator": LLM_STRONG_MODEL,
+    "section_writer": LLM_STRONG_MODEL,
+    "stitch_sections": LLM_STRONG_MODEL,
+    "longform_writer": LLM_STRONG_MODEL,
+    "longform_summary": LLM_FAST_MODEL,
+    **dict(
+        item.strip().split("=", 1) for item in os.getenv("NODE_MODELS", "").split(",") if "=" in item
+    ),
+}
+
+# Groq quota shared by every session in the process; 0 disables a limit
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "30"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "15000"))
+
+# "full" rewrites the whole outline on every revision, "sections" rewrites only the sections the feedback is about
+OUTLINE_REVISION = os.getenv("OUTLINE_REVISION", "full")
+
+# Style of the written post; a forked thread can override both through its state
+DEFAULT_TONE = "professional yet accessible"
+DEFAULT_TARGET_WORDS = os.getenv("LONGFORM_TARGET_WORDS", "8000-12000") if BLOG_GENERATION_MODE == "longform" else "800-1200"
+
+# Keep prompts and checkpoints flat across revision loops
+MESSAGE_WINDOW = int(os.getenv("MESSAGE_WINDOW", "20"))
+TOOL_RESULT_MAX_CHARS = int(os.getenv("TOOL_RESULT_MAX_CHARS", "1500"))
+RESEARCH_TOKEN_BUDGET = int(os.getenv("RESEARCH_TOKEN_BUDGET", "6000"))
+
+# "single" clips the research into one extraction prompt, "map_reduce" summarizes chunks in parallel and merges them
+RESEARCH_EXTRACTION = os.getenv("RESEARCH_EXTRACTION", "single")
+EXTRACTION_CHUNK_TOKENS = int(os.getenv("EXTRACTION_CHUNK_TOKENS", "2000"))
+EXTRACTION_CONCURRENCY = int(os.getenv("EXTRACTION_CONCURRENCY", "4"))
+EXTRACTION_MAX_CHUNKS = int(os.getenv("EXTRACTION_MAX_CHUNKS", "12"))
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token) used for prompt budgets"""
+    return len(text) // 4
+
+def clip_to_tokens(text, budget):
+    """Cut text down to roughly budget tokens, noting how much was dropped"""
+    limit = budget * 4
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}\n[... {len(text) - limit} characters omitted]"
+
+def chunk_text(text, budget):
+    """Split text into pieces of roughly budget tokens, breaking between lines where possible"""
+    limit = budget * 4
+    chunks, current = [], ""
+    for line in text.splitlines(keepends=True):
+        while len(line) > limit:
+            # A single line longer than a chunk (a long page) is cut hard
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+        if len(current) + len(line) > limit:
+            chunks.append(current)
+            current = ""
+        current += line
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+def merge_dicts(left, right):
+    return {**(left or {}), **(right or {})}
+
+def add_bounded_messages(left, right):
+    """add_messages reducer that only keeps the newest MESSAGE_WINDOW messages"""
+    merged = add_messages(left, right)
+    return merged[-MESSAGE_WINDOW:] if MESSAGE_WINDOW else merged
+
 class BlogState(TypedDict):
-    messages: Annotated[List, add_messages]
+    messages: Annotated[List, add_bounded_messages]
     blog_title: str
     research_notes: str
     outline: str
     blog_content: str
     approval: bool
     feedback: str
+    sections: Annotated[List, operator.add]
+    research_results: List[dict]
+    models: Annotated[dict, merge_dicts]  # node -> model it last ran on
+    tone: str  # defaults to DEFAULT_TONE
+    target_words: str  # "min-max" words, defaults to DEFAULT_TARGET_WORDS
+    output_path: str  # markdown file a long-form document was written to
+
+class SectionTask(TypedDict):
+    blog_title: str
+    research_notes: str
+    headings: List[str]
+    index: int
+    section: str
+    tone: str
+    target_words: str
+
+def new_blog_input(topic):
+    """Initial graph input for a blog about topic"""
+    return {
+        "messages": [HumanMessage(content=f"Write a blog about {topic}")],
+        "blog_title": "",
+        "research_notes": "",
+        "outline": "",
+        "blog_content": "",
+        "approval": False,
+        "feedback": ""
+    }
 
 graph_builder = StateGraph(BlogState)
-llm = ChatGroq(model="gemma2-9b-It")
 
-def input_node(state: BlogState):
+# Per-thread, per-node timings, tokens and cache use; attached to every compiled graph below
+metrics = GraphMetrics()
+
+# The response cache and the research store open SQLite files, so they are created on first use as well
+_llm_cache = None
+_research_store = None
+_stores_lock = threading.Lock()
+
+def get_llm_cache():
+    """The LLM response cache, opened on the first call; None when LLM_CACHE is off"""
+    global _llm_cache
+    with _stores_lock:
+        if _llm_cache is None and LLM_CACHE_ENABLED:
+            _llm_cache = SQLiteLRUCache(
+                LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES, ttl_seconds=LLM_CACHE_TTL_SECONDS
+            )
+            _llm_cache.listeners.append(metrics.cache_listener)
+    return _llm_cache
+
+# Every uncached LLM call waits its turn here; interactive runs go ahead of batch ones
+llm_scheduler = LLMScheduler(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE)
+
+def throttle_on_groq_429(host, retry_after):
+    if host.endswith("groq.com"):
+        llm_scheduler.throttle(retry_after)
+
+rate_limit_listeners.append(throttle_on_groq_429)
+metrics.gauges.append(llm_scheduler.gauges)
+
+# Chat models are built on first use, so importing graph needs neither the Groq SDK nor an API key
+llm = None
+# Same client with the cache switched off, for nodes not listed in LLM_CACHE_NODES
+uncached_llm = None
+_llm_lock = threading.Lock()
+
+def chat_models():
+    """(cached, uncached) chat models, creating them on the first call"""
+    global llm, uncached_llm
+    with _llm_lock:
+        if llm is None:
+            cached = chat_model(
+                LLM_MODEL,
+                cache=get_llm_cache() or False,
+                rate_limiter=llm_scheduler,
+                callbacks=[llm_scheduler.usage_handler],
+            )
+            uncached_llm = cached.model_copy(update={"cache": False})
+            llm = cached
+    return llm, uncached_llm
+
+def model_for(node):
+    """Model routed to node, honouring a per-run config["configurable"]["models"] override"""
+    try:
+        overrides = get_config().get("configurable", {}).get("models") or {}
+    except RuntimeError:
+        # Outside a graph run (speculative drafts) only the process-wide routing applies
+        overrides = {}
+    return overrides.get(node) or NODE_MODELS.get(node, LLM_MODEL)
+
+def node_llm(node, model=None):
+    """Return the chat model a node should call, honouring model routing and the per-node cache switch"""
+    cached, uncached = chat_models()
+    base = cached if node in LLM_CACHE_NODES else uncached
+    model = model or model_for(node)
+    # Same clients, cache and scheduler; only the model name sent with each request changes
+    return base if model == base.model_name else base.model_copy(update={"model_name": model})
+
+def topic_prompt(state: BlogState):
     # Extract the last message content properly
     last_message = state['messages'][-1] if state['messages'] else ""
     user_content = last_message.content if hasattr(last_message, 'content') else str(last_message)
     
-    input_prompt = f"""Given the user input: "{user_content}", extract the blog title/topic.
+    return f"""Given the user input: "{user_content}", extract the blog title/topic.
     Please return only the topic and nothing else."""
-    
-    response = llm.invoke(input_prompt)
+
+# Requests such as "Write a blog about X" (what new_blog_input builds) or "Draft an article on X"
+TOPIC_TEMPLATE = re.compile(
+    r"^\s*(?:please\s+)?(?:write|create|draft|generate)\s+(?:me\s+)?(?:a|an)\s+"
+    r"(?:(?:short|long|detailed)\s+)?(?:blog(?:\s+post)?|article|post)\s+(?:about|on)\s+"
+    r"(?P<topic>[^\n]{1,150}?)[\s.!?]*$",
+    re.IGNORECASE,
+)
+
+def template_topic(state: BlogState):
+    """Topic of a templated request, or None when the LLM has to work it out"""
+    last_message = state['messages'][-1] if state['messages'] else None
+    match = TOPIC_TEMPLATE.match(getattr(last_message, "content", "") or "")
+    if match is None:
+        return None
+    topic = match.group("topic").strip().strip("\"'").strip()
+    return topic or None
+
+def fast_topic(state: BlogState):
+    topic = template_topic(state) if FAST_PATH else None
+    # Noted as the node's "model" so the state shows the LLM was skipped
+    return {"blog_title": topic, "models": {"input_node": "fast-path"}} if topic else None
+
+def input_node(state: BlogState):
+    update = fast_topic(state)
+    if update:
+        return update
+    response = node_llm("input_node").invoke(topic_prompt(state))
+    return {
+        "blog_title": response.content
+    }
+
+async def ainput_node(state: BlogState):
+    update = fast_topic(state)
+    if update:
+        return update
+    response = await node_llm("input_node").ainvoke(topic_prompt(state))
     return {
         "blog_title": response.content
     }
 
-# Initialize tool
-tool = TavilySearchResults(max_results=3)
-llm_with_tools = llm.bind_tools(tools=[tool])
+# Initialize tool; searches go through a TTL cache that also merges identical in-flight queries.
+# Name and description match LangChain's TavilySearchResults, which is too slow to import just for these.
+TAVILY_TOOL_NAME = "tavily_search_results_json"
+TAVILY_TOOL_DESCRIPTION = (
+    "A search engine optimized for comprehensive, accurate, and trusted results. "
+    "Useful for when you need to answer questions about current events. Input should be a search query."
+)
+# Web search behind the research store; use_backends() swaps them, including before the store is opened
+_web_search = (tavily_search, atavily_search)
 
-def research_node(state: BlogState):
-    research_prompt = f"""
+def get_research_store():
+    """The persistent research store, opened on the first call; None when RESEARCH_STORE is empty"""
+    global _research_store
+    with _stores_lock:
+        if _research_store is None and RESEARCH_STORE_PATH:
+            _research_store = ResearchStore(
+                RESEARCH_STORE_PATH, *_web_search, max_age_seconds=RESEARCH_STORE_MAX_AGE_HOURS * 3600
+            )
+            _research_store.listeners.append(metrics.cache_listener)
+            metrics.gauges.append(_research_store.gauges)
+    return _research_store
+
+def stored_search(query, max_results=3):
+    return get_research_store().search(query, max_results)
+
+async def astored_search(query, max_results=3):
+    # Opening the store creates its schema, so the first call does that off the event loop
+    store = _research_store or await asyncio.to_thread(get_research_store)
+    return await store.asearch(query, max_results)
+
+# Behind the in-memory cache, the persistent research store answers queries it already covers
+# and indexes everything fetched from the web
+search_cache = SearchCache(
+    stored_search if RESEARCH_STORE_PATH else tavily_search,
+    astored_search if RESEARCH_STORE_PATH else atavily_search,
+    ttl_seconds=SEARCH_CACHE_TTL_SECONDS,
+)
+search_cache.listeners.append(metrics.cache_listener)
+tool = search_cache.as_tool(TAVILY_TOOL_NAME, TAVILY_TOOL_DESCRIPTION, max_results=3)
+
+def use_backends(chat=None, search=None, async_search=None):
+    """Swap the chat model and/or web search backend, e.g. for offline fakes; call before running the graph"""
+    global llm, uncached_llm, _web_search
+    if chat is not None:
+        scheduling = {"rate_limiter": llm_scheduler, "callbacks": [llm_scheduler.usage_handler]}
+        with _llm_lock:
+            llm = chat.model_copy(update={"cache": get_llm_cache() or False, **scheduling})
+            uncached_llm = chat.model_copy(update={"cache": False, **scheduling})
+    if search is not None and RESEARCH_STORE_PATH:
+        with _stores_lock:
+            _web_search = (search, async_search)
+            if _research_store is not None:
+                _research_store.backend = search
+                _research_store.async_backend = async_search
+    elif search is not None:
+        search_cache.backend = search
+        search_cache.async_backend = async_search
+
+def research_prompt(state: BlogState):
+    return [HumanMessage(content=f"""
     Use the Tavily search tool to find the latest developments, news, and statistics about: "{state['blog_title']}".
     Please search the web using the Tavily tool and return your findings.
-    """
+    """)]
+
+def fast_search(state: BlogState):
+    """The tool call research_node's LLM would make, built straight from blog_title"""
+    if not FAST_PATH or not state["blog_title"].strip():
+        return None
+    tool_call = {
+        "name": tool.name,
+        "args": {"query": f"latest developments, news and statistics about {state['blog_title'].strip()}"},
+        "id": f"call_{uuid.uuid4().hex[:24]}",
+    }
+    return {
+        "messages": [AIMessage(content="", tool_calls=[tool_call])],
+        "models": {"research_node": "fast-path"}
+    }
+
+def research_node(state: BlogState):
+    update = fast_search(state)
+    if update:
+        return update
+    llm_with_tools = node_llm("research_node").bind_tools(tools=[tool])
+    response = llm_with_tools.invoke(research_prompt(state))
     
-    response = llm_with_tools.invoke([HumanMessage(content=research_prompt)])
+    return {
+        "messages": [response]  # Add the response to messages
+    }
+
+async def aresearch_node(state: BlogState):
+    update = fast_search(state)
+    if update:
+        return update
+    llm_with_tools = node_llm("research_node").bind_tools(tools=[tool])
+    response = await llm_with_tools.ainvoke(research_prompt(state))
     
     return {
         "messages": [response]  # Add the response to messages
     }
 
-def extract_research(state: BlogState):
-    """Extract research content from tool calls and responses"""
+def multi_research(state: BlogState):
+    """Search several angles of the topic at once and keep the best unique results"""
+    queries = expand_queries(state['blog_title'])
+    result_lists = run_queries(
+        lambda query: search_cache.search(query, max_results=3), queries, RESEARCH_CONCURRENCY
+    )
+    return {
+        "research_results": dedupe_and_rank(result_lists, limit=RESEARCH_MAX_RESULTS)
+    }
+
+async def amulti_research(state: BlogState):
+    queries = expand_queries(state['blog_title'])
+    result_lists = await arun_queries(
+        lambda query: search_cache.asearch(query, max_results=3), queries, RESEARCH_CONCURRENCY
+    )
+    return {
+        "research_results": dedupe_and_rank(result_lists, limit=RESEARCH_MAX_RESULTS)
+    }
+
+def research_text(state: BlogState):
+    """Raw research gathered so far: tool calls, tool responses and ranked search results"""
     messages = state["messages"]
-    blog_title = state["blog_title"]
     
     # Look for tool calls and their results in messages
     research_content = []
@@ -68,11 +435,18 @@ def extract_research(state: BlogState):
                 if hasattr(tool_call, 'args'):
                     research_content.append(f"Search query: {tool_call.args}")
     
-    # Combine all research content
-    all_research = "\n".join(research_content)
+    if state.get("research_results"):
+        research_content.append(format_results(state["research_results"]))
+    
+    return "\n".join(research_content)
+
+def extraction_prompt(state: BlogState, research=None):
+    """Build the extraction prompt for research (all of it, clipped to budget, by default)"""
+    # Combine all research content, capped so the prompt stays within budget
+    all_research = clip_to_tokens(research_text(state) if research is None else research, RESEARCH_TOKEN_BUDGET)
     
     # Ask LLM to extract and format the research
-    extraction_prompt = f"""From the following research data about "{blog_title}", extract and organize the key information:
+    return f"""From the following research data about "{state['blog_title']}", extract and organize the key information:
 
 Research Data:
 {all_research}
@@ -84,15 +458,81 @@ Please organize this into clear bullet points covering:
 - Market data (if applicable)
 
 Return only the organized research findings as bullet points."""
-    
-    response = llm.invoke(extraction_prompt)
-    
-    return {
-        "research_notes": response.content or f"Research completed for {blog_title}"
+
+def chunk_prompts(state: BlogState):
+    """Map step prompts, one per research chunk; a single prompt when map-reduce is off or not needed"""
+    research = research_text(state)
+    if RESEARCH_EXTRACTION != "map_reduce" or estimate_tokens(research) <= EXTRACTION_CHUNK_TOKENS:
+        return [extraction_prompt(state, research)]
+    # Past EXTRACTION_MAX_CHUNKS the extra research is dropped so latency stays bounded
+    chunks = chunk_text(research, EXTRACTION_CHUNK_TOKENS)[:EXTRACTION_MAX_CHUNKS]
+    return [extraction_prompt(state, chunk) for chunk in chunks]
+
+def merge_prompt(state: BlogState, partials):
+    """Reduce step prompt combining the chunk summaries into one set of research notes"""
+    notes = "\n\n".join(f"Notes {i}:\n{partial}" for i, partial in enumerate(partials, 1))
+    return f"""The following notes were extracted from different parts of the research about "{state['blog_title']}":
+
+{clip_to_tokens(notes, RESEARCH_TOKEN_BUDGET)}
+
+Merge them into one set of bullet points covering:
+- Key facts and statistics
+- Recent developments
+- Important findings
+- Market data (if applicable)
+
+Remove duplicates, keep every distinct fact and number, and return only the merged research findings as bullet points."""
+
+def extracted_research(state: BlogState, response):
+    """State update once the research has been summarized"""
+    # The raw search payloads are summarized now; keep only short stubs in the history.
+    # Same message ids, so add_messages replaces them in place.
+    trimmed = [
+        msg.model_copy(update={"content": clip_to_tokens(msg.content, TOOL_RESULT_MAX_CHARS // 4)})
+        for msg in state["messages"]
+        if isinstance(msg, ToolMessage) and isinstance(msg.content, str) and len(msg.content) > TOOL_RESULT_MAX_CHARS
+    ]
+    update = {
+        "research_notes": response.content or f"Research completed for {state['blog_title']}",
+        "messages": trimmed
     }
+    if state.get("research_results"):
+        # Likewise the ranked pages of multi mode: keep which sources were used, not their text
+        update["research_results"] = [
+            {key: result[key] for key in ("title", "url", "score", "hits") if key in result}
+            for result in state["research_results"]
+        ]
+    return update
 
-def outline_generator(state: BlogState):
-    outline_prompt = f"""Based on the research notes below, generate a detailed blog outline for the topic: "{state['blog_title']}"
+def store_research_notes(state: BlogState, response):
+    """Index the extracted notes in the research store so later topics can reuse them"""
+    if RESEARCH_STORE_PATH and response.content:
+        get_research_store().add_notes(state["blog_title"], response.content)
+
+def extract_research(state: BlogState):
+    """Extract research content from tool calls and responses"""
+    prompts = chunk_prompts(state)
+    if len(prompts) == 1:
+        response = node_llm("extract_research").invoke(prompts[0])
+    else:
+        partials = node_llm("extract_research").batch(prompts, config={"max_concurrency": EXTRACTION_CONCURRENCY})
+        response = node_llm("extract_research").invoke(merge_prompt(state, [p.content for p in partials]))
+    store_research_notes(state, response)
+    return extracted_research(state, response)
+
+async def aextract_research(state: BlogState):
+    prompts = chunk_prompts(state)
+    if len(prompts) == 1:
+        response = await node_llm("extract_research").ainvoke(prompts[0])
+    else:
+        partials = await node_llm("extract_research").abatch(prompts, config={"max_concurrency": EXTRACTION_CONCURRENCY})
+        response = await node_llm("extract_research").ainvoke(merge_prompt(state, [p.content for p in partials]))
+    # SQLite writes (and possibly opening the store) stay off the event loop
+    await asyncio.to_thread(store_research_notes, state, response)
+    return extracted_research(state, response)
+
+def outline_prompt(state: BlogState):
+    return f"""Based on the research notes below, generate a detailed blog outline for the topic: "{state['blog_title']}"
 
 Research Notes:
 {state['research_notes']}
@@ -103,15 +543,28 @@ Create a structured outline with:
 3. Conclusion
 
 Make it engaging and informative."""
-    
-    response = llm.invoke(outline_prompt)
+
+def outline_generator(state: BlogState):
+    response = node_llm("outline_generator").invoke(outline_prompt(state))
+    return {
+        "outline": response.content,
+        "messages": [response]
+    }
+
+async def aoutline_generator(state: BlogState):
+    response = await node_llm("outline_generator").ainvoke(outline_prompt(state))
     return {
         "outline": response.content,
         "messages": [response]
     }
 
-def blog_generator(state: BlogState):
-    blog_prompt = f"""Write a comprehensive and engaging blog post based on the following information:
+def target_word_count(state):
+    """Middle of the state's "min-max" target word range"""
+    bounds = [int(n) for n in re.findall(r"\d+", state.get("target_words") or DEFAULT_TARGET_WORDS)[:2]]
+    return sum(bounds) // len(bounds) if bounds else 1000
+
+def blog_prompt(state: BlogState):
+    return f"""Write a comprehensive and engaging blog post based on the following information:
 
 Blog Title: {state['blog_title']}
 
@@ -126,22 +579,317 @@ Instructions:
 - Include an engaging introduction that hooks the reader
 - Develop each main section with detailed content based on the research notes
 - Use the research findings to support your points with facts and statistics
-- Write in a professional yet accessible tone
+- Write in a {state.get('tone') or DEFAULT_TONE} tone
 - Include smooth transitions between sections
 - End with a compelling conclusion that summarizes key points
-- Aim for 800-1200 words
+- Aim for {state.get('target_words') or DEFAULT_TARGET_WORDS} words
 - Make it informative, engaging, and valuable to readers
 
 Please write the complete blog post now:"""
-    
-    response = llm.invoke(blog_prompt)
+
+def speculative_draft(state: BlogState, cancelled):
+    """blog_generator's LLM call, streamed so a cancelled draft closes the request early"""
+    response = None
+    for chunk in node_llm("blog_generator", state["draft_model"]).stream(blog_prompt(state)):
+        if cancelled.is_set():
+            return None
+        response = chunk if response is None else response + chunk
+    return None if response is None else message_chunk_to_message(response)
+
+speculative_drafts = SpeculativeDrafts(speculative_draft)
+
+def draft_state(state: BlogState):
+    """State a speculative draft is written from, including the model blog_generator would use"""
+    return {**state, "draft_model": model_for("blog_generator")}
+
+def blog_generator(state: BlogState, config: RunnableConfig):
+    # An approved outline may already have a draft written while it was under review
+    response = speculative_drafts.take(config["configurable"]["thread_id"], draft_state(state)) if SPECULATIVE_DRAFTS else None
+    if response is None:
+        response = node_llm("blog_generator").invoke(blog_prompt(state))
     return {
         "blog_content": response.content,
         "messages": [response]
     }
 
-def human_review(state: BlogState):
+async def ablog_generator(state: BlogState, config: RunnableConfig):
+    response = await speculative_drafts.atake(config["configurable"]["thread_id"], draft_state(state)) if SPECULATIVE_DRAFTS else None
+    if response is None:
+        response = await node_llm("blog_generator").ainvoke(blog_prompt(state))
+    return {
+        "blog_content": response.content,
+        "messages": [response]
+    }
+
+# Caps how many section_writer branches talk to the LLM at the same time
+section_slots = threading.BoundedSemaphore(SECTION_CONCURRENCY)
+# asyncio semaphores are bound to one event loop, so keep one per loop
+async_section_slots = weakref.WeakKeyDictionary()
+
+def section_prompt(task: SectionTask):
+    headings = task["headings"]
+    index = task["index"]
+    if index + 1 < len(headings):
+        transition = f'End with a sentence that leads naturally into the next section, "{headings[index + 1]}".'
+    else:
+        transition = "This is the final section, so close the post with a compelling wrap-up."
+
+    return f"""You are writing section {index + 1} of {len(headings)} of a blog post titled "{task['blog_title']}".
+
+All sections in order:
+{chr(10).join(f"{i + 1}. {heading}" for i, heading in enumerate(headings))}
+
+Research Notes:
+{task['research_notes']}
+
+Write only this section, following its outline:
+{task['section']}
+
+Instructions:
+- Start with the section heading as a markdown "##" heading
+- Use the research findings to support your points with facts and statistics
+- Write in a {task.get('tone') or DEFAULT_TONE} tone
+- Aim for about {max(150, target_word_count(task) // len(headings))} words
+- {transition}
+
+Please write the section now:"""
+
+def section_writer(task: SectionTask):
+    """Write a single outline section; runs as one of several parallel branches"""
+    with section_slots:
+        response = node_llm("section_writer").invoke(section_prompt(task))
+    return {
+        "sections": [{"index": task["index"], "heading": task["headings"][task["index"]], "content": response.content}]
+    }
+
+async def asection_writer(task: SectionTask):
+    slots = async_section_slots.setdefault(asyncio.get_running_loop(), asyncio.Semaphore(SECTION_CONCURRENCY))
+    async with slots:
+        response = await node_llm("section_writer").ainvoke(section_prompt(task))
+    return {
+        "sections": [{"index": task["index"], "heading": task["headings"][task["index"]], "content": response.content}]
+    }
+
+def ordered_sections(state: BlogState):
+    # Keyed by index so a replayed branch can never duplicate a section
+    return sorted({s["index"]: s for s in state["sections"]}.values(), key=lambda s: s["index"])
+
+def bookend_prompts(state: BlogState):
+    """Prompts for the introduction and/or conclusion the outline did not include"""
+    headings = [s["heading"] for s in ordered_sections(state)]
+    missing = [
+        part for part, marker in (("introduction", "intro"), ("conclusion", "conclu"))
+        if not any(marker in heading.lower() for heading in headings)
+    ]
+    return {
+        part: f"""Write a short {part} (under 150 words) for a blog post titled "{state['blog_title']}" with these sections:
+{chr(10).join(f"- {heading}" for heading in headings)}
+
+Return only the {part} paragraph(s), without a heading."""
+        for part in missing
+    }
+
+def stitched_blog(state: BlogState, bookends):
+    parts = [bookends["introduction"]] if "introduction" in bookends else []
+    parts += [s["content"] for s in ordered_sections(state)]
+    if "conclusion" in bookends:
+        parts.append(f"## Conclusion\n\n{bookends['conclusion']}")
+    blog_content = "\n\n".join(parts)
+
+    return {
+        "blog_content": blog_content,
+        "messages": [AIMessage(content=blog_content)]
+    }
+
+def stitch_sections(state: BlogState):
+    """Join the parallel sections in outline order, adding an intro/conclusion if the outline lacks one"""
+    prompts = bookend_prompts(state)
+    # The intro and conclusion are independent, so generate them together
+    responses = node_llm("stitch_sections").batch(list(prompts.values())) if prompts else []
+    return stitched_blog(state, dict(zip(prompts, (r.content for r in responses))))
+
+async def astitch_sections(state: BlogState):
+    prompts = bookend_prompts(state)
+    responses = await node_llm("stitch_sections").abatch(list(prompts.values())) if prompts else []
+    return stitched_blog(state, dict(zip(prompts, (r.content for r in responses))))
+
+def longform_plan(state: BlogState):
+    """(sections, [(section index, part, parts, words), ...]) splitting the target length into bounded parts"""
+    sections = parse_sections(state['outline'])
+    if len(sections) < 2:
+        # An unstructured outline is written as one long section
+        sections = [{"heading": state['blog_title'], "body": state['outline']}]
+    section_words = max(150, target_word_count(state) // len(sections))
+    parts = -(-section_words // LONGFORM_PART_WORDS)
+    plan = [(index, part, parts, section_words // parts) for index in range(len(sections)) for part in range(parts)]
+    return sections, plan
+
+def longform_part_prompt(state: BlogState, sections, step, summary, tail):
+    index, part, parts, words = step
+    heading = sections[index]["heading"]
+    if part == 0:
+        opening = 'Start with the section heading as a markdown "##" heading'
+    else:
+        opening = "Do not repeat the section heading; continue exactly where the previous passage ends"
+    if part + 1 < parts:
+        ending = "Stop at a paragraph break; the section continues in the next part"
+    elif index + 1 < len(sections):
+        ending = f'End with a sentence that leads naturally into the next section, "{sections[index + 1]["heading"]}"'
+    else:
+        ending = "This is the end of the document, so close it with a compelling wrap-up"
+    previous = f"End of the previous passage:\n{tail}\n\n" if tail else ""
+
+    # Everything up to the section list is the same for every part, so provider-side prompt caching can reuse it
+    return f"""You are writing a long-form document titled "{state['blog_title']}", one part at a time.
+
+Research Notes:
+{state['research_notes']}
+
+All sections in order:
+{chr(10).join(f"{i + 1}. {section['heading']}" for i, section in enumerate(sections))}
+
+Summary of what has been written so far:
+{summary or "Nothing yet; this is the start of the document."}
+
+{previous}Now write part {part + 1} of {parts} of section {index + 1}, "{heading}", following its outline:
+{sections[index]['body']}
+
+Instructions:
+- {opening}
+- Do not repeat points, facts or examples already covered in the summary
+- Use the research findings to support your points with facts and statistics
+- Write in a {state.get('tone') or DEFAULT_TONE} tone
+- Aim for about {words} words
+- {ending}
+
+Please write this part now:"""
+
+def longform_summary_prompt(state: BlogState, heading, summary, text):
+    return f"""Update the running summary of the long-form document "{state['blog_title']}" with the passage below.
+List the points, facts and examples each section has covered so far, so later parts do not repeat them.
+Keep the whole summary under {LONGFORM_SUMMARY_WORDS} words.
+
+Current summary:
+{summary or "(empty)"}
+
+New passage, from section "{heading}":
+{text}
+
+Return only the updated summary."""
+
+def longform_output_path(thread_id):
+    """Markdown file a thread's long-form document is written to"""
+    os.makedirs(LONGFORM_DIR, exist_ok=True)
+    return os.path.join(LONGFORM_DIR, re.sub(r"[^\w.-]", "_", thread_id) + ".md")
+
+def longform_result(state: BlogState, path, sections, words):
+    """State update pointing at the written file; the document itself never enters the state"""
+    notice = f"Long-form document written to `{path}`: about {words:,} words in {len(sections)} sections."
+    return {
+        "blog_content": notice,
+        "output_path": path,
+        "messages": [AIMessage(content=notice)],
+        "models": {name: model_for(name) for name in ("longform_writer", "longform_summary")},
+    }
+
+def longform_models():
+    # Summaries are bookkeeping, so their tokens are kept out of the streamed output
+    return node_llm("longform_writer"), node_llm("longform_summary").with_config(tags=[TAG_NOSTREAM])
+
+def longform_steps(state: BlogState):
+    """Generator running the part loop shared by longform_writer and alongform_writer.
+
+    Yields ("part", prompt) and expects the part's text to be sent back, then,
+    after every part but the last, ("summary", prompt) and expects the updated
+    summary. Only the summary and the end of the previous part are carried
+    between parts. Returns (sections, words written).
+    """
+    sections, plan = longform_plan(state)
+    summary, tail, words = "", "", 0
+    for number, step in enumerate(plan):
+        text = yield "part", longform_part_prompt(state, sections, step, summary, tail)
+        words += len(text.split())
+        tail = text[-LONGFORM_TAIL_CHARS:]
+        # Nothing comes after the last part, so its summary would go unused
+        if number + 1 < len(plan):
+            reply = yield "summary", longform_summary_prompt(state, sections[step[0]]["heading"], summary, text)
+            summary = clip_to_tokens(reply, LONGFORM_SUMMARY_WORDS * 2)
+    return sections, words
+
+def open_longform_file(state: BlogState, config: RunnableConfig):
+    """(path, file) for the thread's document, started over with its title"""
+    path = longform_output_path(config["configurable"]["thread_id"])
+    output = open(path, "w", encoding="utf-8")
+    output.write(f"# {state['blog_title']}\n\n")
+    return path, output
+
+def append_flushed(output, text):
+    output.write(text)
+    output.flush()
+
+def longform_writer(state: BlogState, config: RunnableConfig):
+    """Write a long document part by part, appending each token to a markdown file as it arrives.
+
+    A rerun of the node starts the file over.
+    """
+    writer, summarizer = longform_models()
+    steps = longform_steps(state)
+    path, output = open_longform_file(state, config)
+    with output:
+        reply = None
+        while True:
+            try:
+                kind, prompt = steps.send(reply)
+            except StopIteration as done:
+                sections, words = done.value
+                break
+            if kind == "summary":
+                reply = summarizer.invoke(prompt).content
+                continue
+            chunks = []
+            for chunk in writer.stream(prompt):
+                output.write(chunk.content)
+                chunks.append(chunk.content)
+            append_flushed(output, "\n\n")
+            reply = "".join(chunks)
+    return longform_result(state, path, sections, words)
+
+async def alongform_writer(state: BlogState, config: RunnableConfig):
+    writer, summarizer = longform_models()
+    steps = longform_steps(state)
+    # File calls go to a worker thread so the event loop never blocks on disk
+    path, output = await asyncio.to_thread(open_longform_file, state, config)
+    try:
+        reply = None
+        while True:
+            try:
+                kind, prompt = steps.send(reply)
+            except StopIteration as done:
+                sections, words = done.value
+                break
+            if kind == "summary":
+                reply = (await summarizer.ainvoke(prompt)).content
+                continue
+            chunks, written, pending = [], 0, 0
+            async for chunk in writer.astream(prompt):
+                chunks.append(chunk.content)
+                pending += len(chunk.content)
+                if pending >= LONGFORM_FLUSH_CHARS:
+                    await asyncio.to_thread(append_flushed, output, "".join(chunks[written:]))
+                    written, pending = len(chunks), 0
+            await asyncio.to_thread(append_flushed, output, "".join(chunks[written:]) + "\n\n")
+            reply = "".join(chunks)
+    finally:
+        await asyncio.to_thread(output.close)
+    return longform_result(state, path, sections, words)
+
+def human_review(state: BlogState, config: RunnableConfig):
     """Human review node with interrupt for outline approval"""
+    thread_id = config["configurable"]["thread_id"]
+    # Runs again on resume; starting the same outline twice is a no-op
+    if SPECULATIVE_DRAFTS:
+        speculative_drafts.start(thread_id, draft_state(state))
+    
     result = interrupt({
         "task": "Review the blog outline and approve or provide feedback for revision.",
         "blog_title": state["blog_title"],
@@ -154,27 +902,66 @@ def human_review(state: BlogState):
     approved = result.get("approved", False)
     feedback = result.get("feedback", "")
     
+    # The outline is about to change, so the draft written from it is useless
+    if SPECULATIVE_DRAFTS and not approved:
+        speculative_drafts.discard(thread_id)
+    
     return {
         "approval": approved,
         "feedback": feedback,
         "messages": [HumanMessage(content=f"Human review completed. Approved: {approved}")]
     }
 
+async def ahuman_review(state: BlogState, config: RunnableConfig):
+    # Nothing to await; wrapping it keeps interrupt() working under graph.ainvoke on Python 3.10
+    return human_review(state, config)
+
 def revision_needed(state: BlogState):
     """Check if revision is needed based on approval"""
-    return "revise_outline" if not state.get('approval', False) else "blog_generator"
+    if not state.get('approval', False):
+        return "revise_outline"
 
-def revise_outline(state: BlogState):
-    """Revise the outline based on human feedback"""
+    if BLOG_GENERATION_MODE == "longform":
+        return "longform_writer"
+
+    if BLOG_GENERATION_MODE == "sections":
+        sections = parse_sections(state['outline'])
+        # Fan out one section_writer branch per outline section
+        if len(sections) > 1:
+            headings = [section["heading"] for section in sections]
+            return [
+                Send("section_writer", {
+                    "blog_title": state['blog_title'],
+                    "research_notes": state['research_notes'],
+                    "headings": headings,
+                    "index": index,
+                    "section": section["body"],
+                    "tone": state.get('tone') or DEFAULT_TONE,
+                    "target_words": state.get('target_words') or DEFAULT_TARGET_WORDS
+                })
+                for index, section in enumerate(sections)
+            ]
+
+    # Unstructured outlines fall back to writing the post in one call
+    return "blog_generator"
+
+def revision_prefix(state: BlogState):
+    """Opening shared by every revision prompt of a thread, so provider-side prompt caching can reuse it"""
+    return f"""You are revising the blog outline for "{state['blog_title']}".
+
+Research Notes:
+{state['research_notes']}
+
+"""
+
+def revision_prompt(state: BlogState):
     feedback = state.get('feedback', 'Please improve the outline')
     
-    revision_prompt = f"""The current outline was not approved. Please revise and improve based on this feedback:
+    return revision_prefix(state) + f"""The current outline was not approved. Please revise and improve based on this feedback:
 
 FEEDBACK: {feedback}
 
-Current Title: {state['blog_title']}
 Current Outline: {state['outline']}
-Research Notes: {state['research_notes']}
 
 Create a better, more engaging outline that:
 - Addresses the specific feedback provided
@@ -183,43 +970,117 @@ Create a better, more engaging outline that:
 - Is more compelling and reader-friendly
 
 Provide the revised outline:"""
+
+def section_revision_prompt(state: BlogState, sections, index):
+    headings = "\n".join(f"{i + 1}. {section['heading']}" for i, section in enumerate(sections))
     
-    response = llm.invoke(revision_prompt)
+    return revision_prefix(state) + f"""The current outline was not approved. The feedback concerns only some of its sections:
+
+FEEDBACK: {state.get('feedback', '')}
+
+All sections in order:
+{headings}
+
+Revise only this section to address the feedback, keeping its heading and format:
+{sections[index]['body']}
+
+Return only the revised section."""
+
+def section_revision_plan(state: BlogState):
+    """(sections, {index: prompt}) for an incremental revision, or None when the whole outline is rewritten"""
+    if OUTLINE_REVISION != "sections":
+        return None
+    sections = parse_sections(state['outline'])
+    targets = feedback_targets(sections, state.get('feedback', ''))
+    if targets is None:
+        return None
+    return sections, {index: section_revision_prompt(state, sections, index) for index in targets}
+
+def revised_outline(outline, note="Outline revised based on feedback"):
     return {
-        "outline": response.content,
+        "outline": outline,
         "approval": False,  # Reset approval for next review
         "feedback": "",  # Clear previous feedback
-        "messages": [HumanMessage(content="Outline revised based on feedback")]
+        "messages": [HumanMessage(content=note)]
     }
 
+def merged_revision(state: BlogState, sections, revised):
+    """State update merging revised sections ({index: text}) into the outline, or None if they do not fit"""
+    outline = replace_sections(state['outline'], sections, revised)
+    if outline is None:
+        return None
+    headings = ", ".join(sections[index]["heading"] for index in revised)
+    return revised_outline(outline, f"Outline sections revised based on feedback: {headings}")
+
+def revise_outline(state: BlogState):
+    """Revise the outline based on human feedback, only the sections it concerns when possible"""
+    plan = section_revision_plan(state)
+    if plan is not None:
+        sections, prompts = plan
+        responses = node_llm("revise_outline").batch(list(prompts.values()), config={"max_concurrency": SECTION_CONCURRENCY})
+        update = merged_revision(state, sections, dict(zip(prompts, (r.content for r in responses))))
+        if update is not None:
+            return update
+    return revised_outline(node_llm("revise_outline").invoke(revision_prompt(state)).content)
+
+async def arevise_outline(state: BlogState):
+    plan = section_revision_plan(state)
+    if plan is not None:
+        sections, prompts = plan
+        responses = await node_llm("revise_outline").abatch(list(prompts.values()), config={"max_concurrency": SECTION_CONCURRENCY})
+        update = merged_revision(state, sections, dict(zip(prompts, (r.content for r in responses))))
+        if update is not None:
+            return update
+    return revised_outline((await node_llm("revise_outline").ainvoke(revision_prompt(state))).content)
+
+def record_model(name):
+    """Step appended to an LLM node that notes the model it ran on in the state update"""
+    # A node that skipped its LLM call already says so in its update
+    return RunnableLambda(lambda update: {"models": {name: model_for(name)}, **update}, name=f"{name}_model")
+
+def add_node(name, func, afunc):
+    """Register a node with sync and async implementations, so graph.invoke and graph.ainvoke both work"""
+    runnable = RunnableLambda(func, afunc=afunc, name=name)
+    if name in NODE_MODELS:
+        runnable = runnable | record_model(name)
+    graph_builder.add_node(name, runnable)
+
 # Creating the graph
-graph_builder.add_node("input_node", input_node)
-graph_builder.add_node("research_node", research_node)
-graph_builder.add_node("tools", ToolNode(tools=[tool]))
-graph_builder.add_node("extract_research", extract_research)
-graph_builder.add_node("outline_generator", outline_generator)
-graph_builder.add_node("human_review", human_review)
-graph_builder.add_node("revise_outline", revise_outline)
-graph_builder.add_node("blog_generator", blog_generator)
+add_node("input_node", input_node, ainput_node)
+add_node("extract_research", extract_research, aextract_research)
+add_node("outline_generator", outline_generator, aoutline_generator)
+add_node("human_review", human_review, ahuman_review)
+add_node("revise_outline", revise_outline, arevise_outline)
+add_node("blog_generator", blog_generator, ablog_generator)
+add_node("section_writer", section_writer, asection_writer)
+add_node("stitch_sections", stitch_sections, astitch_sections)
+add_node("longform_writer", longform_writer, alongform_writer)
 
 # Set entry point
 graph_builder.set_entry_point("input_node")
 
 # Add the edges
-graph_builder.add_edge("input_node", "research_node")
+if RESEARCH_MODE == "multi":
+    add_node("multi_research", multi_research, amulti_research)
+    graph_builder.add_edge("input_node", "multi_research")
+    graph_builder.add_edge("multi_research", "extract_research")
+else:
+    add_node("research_node", research_node, aresearch_node)
+    graph_builder.add_node("tools", ToolNode(tools=[tool]))
+    graph_builder.add_edge("input_node", "research_node")
 
-# Fixed conditional edges
-graph_builder.add_conditional_edges(
-    "research_node",
-    tools_condition,
-    {
-        "tools": "tools",  # If tools need to be called
-        "extract_research": "extract_research"  # If no tools needed, go to extract
-    }
-)
+    # Fixed conditional edges
+    graph_builder.add_conditional_edges(
+        "research_node",
+        tools_condition,
+        {
+            "tools": "tools",  # If tools need to be called
+            "extract_research": "extract_research"  # If no tools needed, go to extract
+        }
+    )
 
-# Add edge from tools back to extract_research
-graph_builder.add_edge("tools", "extract_research")
+    # Add edge from tools back to extract_research
+    graph_builder.add_edge("tools", "extract_research")
 graph_builder.add_edge("extract_research", "outline_generator")
 graph_builder.add_edge("outline_generator", "human_review")
 
@@ -229,15 +1090,177 @@ graph_builder.add_conditional_edges(
     revision_needed,
     {
         "revise_outline": "revise_outline",
-        "blog_generator": "blog_generator"
+        "blog_generator": "blog_generator",
+        "section_writer": "section_writer",
+        "longform_writer": "longform_writer"
     }
 )
 
 # Add edge from revision back to human review for re-approval
 graph_builder.add_edge("revise_outline", "human_review")
 graph_builder.add_edge("blog_generator", END)
+graph_builder.add_edge("section_writer", "stitch_sections")
+graph_builder.add_edge("stitch_sections", END)
+graph_builder.add_edge("longform_writer", END)
+
+# The compiled graph and its checkpointer (SQLite-backed when CHECKPOINT_DB is set) are created on
+# first use; `from graph import graph` still works through the module __getattr__ below
+_graph = None
+_graph_lock = threading.Lock()
+
+def get_graph():
+    """The graph compiled with its checkpointer for interrupts, built on the first call"""
+    global _graph
+    with _graph_lock:
+        if _graph is None:
+            _graph = graph_builder.compile(checkpointer=make_checkpointer()).with_config(callbacks=[metrics])
+    return _graph
+
+def __getattr__(name):
+    if name == "graph":
+        return get_graph()
+    if name == "checkpointer":
+        return get_graph().checkpointer
+    if name == "llm_cache":
+        return get_llm_cache()
+    if name == "research_store":
+        return get_research_store()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Nodes that write the post; the checkpoint before them holds the approved outline
+WRITER_NODES = ("blog_generator", "section_writer", "longform_writer")
+
+def fork_point(thread_id, before=WRITER_NODES):
+    """(snapshot, node that wrote it) for the newest checkpoint of thread_id about to run before.
+
+    before is a node name or a tuple of them; the default picks the state right
+    after the outline was approved, in either generation mode.
+    """
+    targets = {before} if isinstance(before, str) else set(before)
+    history = list(get_graph().get_state_history({"configurable": {"thread_id": thread_id}}))
+    for snapshot, parent in zip(history, history[1:] + [None]):
+        if targets & set(snapshot.next):
+            writer = snapshot_writer(snapshot, parent)
+            if writer is not None:
+                return snapshot, writer
+    raise ValueError(f"Thread {thread_id!r} has no checkpoint before {' or '.join(sorted(targets))}")
+
+def snapshot_writer(snapshot, parent):
+    """The single node whose writes produced snapshot, or None if there is no single one"""
+    if parent is not None:
+        # The parent's pending tasks are the node(s) whose writes produced snapshot
+        writers = set(parent.next)
+    else:
+        # The first checkpoint of a forked thread has no parent; it was written as the node feeding its next task
+        writers = {edge.source for edge in get_graph().get_graph().edges if edge.target in snapshot.next}
+    return writers.pop() if len(writers) == 1 else None
+
+# Settings a fork may change; everything else comes from the source thread's checkpoint
+VARIANT_KEYS = ("tone", "target_words")
+
+def variant_values(values):
+    """Validated copy of fork overrides, with target_words normalized to "min-max" or a single count.
+
+    Raises ValueError for keys outside VARIANT_KEYS, an empty tone, or a
+    target_words that is not a positive whole number or range.
+    """
+    checked = {}
+    for key, value in (values or {}).items():
+        if key not in VARIANT_KEYS:
+            raise ValueError(f"Cannot override {key!r}; a variant may only set {' and '.join(VARIANT_KEYS)}")
+        value = str(value).strip()
+        if key == "target_words":
+            bounds = re.fullmatch(r"(\d+)\s*(?:-\s*(\d+))?", value)
+            low, high = (int(bounds[1]), int(bounds[2] or bounds[1])) if bounds else (0, 0)
+            if low <= 0 or high < low:
+                raise ValueError(f"target_words must be a positive number of words or a range like 1500-2000, not {value!r}")
+            value = f"{low}-{high}" if high != low else str(low)
+        elif not value:
+            raise ValueError(f"{key} must not be empty")
+        checked[key] = value
+    return checked
+
+def fork_thread(thread_id, values=None, before=WRITER_NODES, new_thread_id=None):
+    """Copy thread_id's state just before node(s) `before` into a new thread, with values overridden.
+
+    Upstream results (topic, research, approved outline) are reused as they
+    are; resuming the new thread with graph.invoke(None, config) runs only the
+    downstream nodes. Routing is re-evaluated on the new values, so forks from
+    an approved outline pick up a changed tone or length in either generation
+    mode. values may only hold VARIANT_KEYS (see variant_values). Forks can be
+    forked again. Returns the new thread's config.
+    """
+    values = variant_values(values)
+    snapshot, writer = fork_point(thread_id, before)
+    config = {"configurable": {"thread_id": new_thread_id or f"{thread_id}-fork-{uuid.uuid4().hex[:8]}"}}
+    return get_graph().update_state(config, {**snapshot.values, **values}, as_node=writer)
+
+# SQLite needs its async saver for graph.ainvoke/astream, compiled once per event loop
+async_graphs = weakref.WeakKeyDictionary()
+
+async def _compile_async_graph():
+    return graph_builder.compile(checkpointer=await make_async_checkpointer()).with_config(callbacks=[metrics])
+
+async def get_async_graph():
+    """Graph for asyncio callers; with the default MemorySaver this is simply graph"""
+    if not CHECKPOINT_DB:
+        return get_graph()
+    loop = asyncio.get_running_loop()
+    if loop not in async_graphs:
+        # Store the task, not the graph, so concurrent first callers share one connection
+        async_graphs[loop] = asyncio.ensure_future(_compile_async_graph())
+    return await asyncio.shield(async_graphs[loop])
 
-# Compile the graph with checkpointer for interrupts
-checkpointer = MemorySaver()
-graph = graph_builder.compile(checkpointer=checkpointer)
+async def close_async_graph():
+    """Close this event loop's SQLite connection; call before the loop shuts down"""
+    task = async_graphs.pop(asyncio.get_running_loop(), None)
+    if task is not None:
+        await (await task).checkpointer.conn.close()
+
+# Nodes whose LLM output is shown to the user while it is being generated
+STREAMING_NODES = ("outline_generator", "revise_outline", "blog_generator", "longform_writer")
+
+def _handle_stream_part(mode, payload, run):
+    """Fold one (mode, payload) pair from graph.stream into run, forwarding tokens and task events"""
+    if mode == "messages":
+        chunk, metadata = payload
+        # Only model output; node updates such as "Outline revised" notes are skipped
+        if isinstance(chunk, AIMessage) and chunk.content and metadata.get("langgraph_node") in STREAMING_NODES:
+            run["on_token"](metadata["langgraph_node"], chunk.content)
+    elif mode == "tasks":
+        run["on_task"](payload)
+    elif mode == "updates" and "__interrupt__" in payload:
+        run["interrupts"].extend(payload["__interrupt__"])
+    elif mode == "values":
+        run["latest"] = payload
+
+def _new_stream_run(on_token, on_task):
+    modes = ["messages", "updates", "values"] + (["tasks"] if on_task else [])
+    return modes, {"latest": {}, "interrupts": [], "on_token": on_token, "on_task": on_task}
+
+def _stream_result(run):
+    if run["interrupts"]:
+        return {**run["latest"], "__interrupt__": run["interrupts"]}
+    return run["latest"]
+
+def stream_graph(graph_input, config, on_token, on_task=None):
+    """Run the graph like graph.invoke, forwarding LLM tokens as they arrive.
+
+    on_token(node, text) is called for every chunk produced inside one of the
+    STREAMING_NODES. on_task(event), if given, receives LangGraph's task events:
+    one with "input" when a node starts and one with "result" when it ends.
+    The return value matches graph.invoke, including the __interrupt__ key
+    when the run pauses for human review.
+    """
+    modes, run = _new_stream_run(on_token, on_task)
+    for mode, payload in get_graph().stream(graph_input, config=config, stream_mode=modes):
+        _handle_stream_part(mode, payload, run)
+    return _stream_result(run)
 
+async def astream_graph(graph_input, config, on_token, on_task=None):
+    """Async counterpart of stream_graph, running on the event loop's async graph"""
+    modes, run = _new_stream_run(on_token, on_task)
+    async_graph = await get_async_graph()
+    async for mode, payload in async_graph.astream(graph_input, config=config, stream_mode=modes):
+        _handle_stream_part(mode, payload, run)
+    return _stream_result(run)
@@ -0,0 +1,368 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_core.callbacks import BaseCallbackHandler
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Where per-node events (JSON lines) and Prometheus text metrics are written; empty disables either.
+# The event log is opt-in; once it reaches METRICS_LOG_MAX_MB it is moved to METRICS_LOG + ".1" and started over.
+METRICS_LOG = os.getenv("METRICS_LOG", "")
+METRICS_LOG_MAX_MB = float(os.getenv("METRICS_LOG_MAX_MB", "50"))
+METRICS_PROM_PATH = os.getenv("METRICS_PROM_PATH", ".cache/metrics.prom")
+# Both files are written by a background thread at most this often, never by the node that finished
+METRICS_EXPORT_SECONDS = float(os.getenv("METRICS_EXPORT_SECONDS", "5"))
+METRICS_MAX_THREADS = int(os.getenv("METRICS_MAX_THREADS", "200"))
+# USD per million (input, output) tokens on Groq; other models use the LLM_*_COST_PER_MTOK fallback
+MODEL_PRICES = {
+    "llama-3.1-8b-instant": (0.05, 0.08),
+    "gemma2-9b-it": (0.20, 0.20),
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+}
+LLM_INPUT_COST_PER_MTOK = float(os.getenv("LLM_INPUT_COST_PER_MTOK", "0.20"))
+LLM_OUTPUT_COST_PER_MTOK = float(os.getenv("LLM_OUTPUT_COST_PER_MTOK", "0.20"))
+
+def cost_usd(model, prompt_tokens, completion_tokens):
+    input_price, output_price = MODEL_PRICES.get(
+        (model or "").lower(), (LLM_INPUT_COST_PER_MTOK, LLM_OUTPUT_COST_PER_MTOK)
+    )
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+def _current_run():
+    """(thread_id, node) of the graph node running in this context, or None outside a graph run"""
+    from langgraph.config import get_config
+
+    try:
+        config = get_config()
+    except RuntimeError:
+        return None
+    return (
+        config.get("configurable", {}).get("thread_id", "unknown"),
+        config.get("metadata", {}).get("langgraph_node", "unknown"),
+    )
+
+def token_usage(response):
+    """(prompt, completion, cached) for an LLMResult; cached responses spent no tokens"""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                # LangChain zeroes total_cost on responses replayed from the LLM cache
+                if usage.get("total_cost") == 0:
+                    return 0, 0, True
+                return usage.get("input_tokens", 0), usage.get("output_tokens", 0), False
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0), False
+
+def _new_thread():
+    return {
+        "nodes": {},  # node -> {"runs", "seconds", "prompt_tokens", "completion_tokens", "llm_calls", "cached_calls", "errors", "model"}
+        "tools": {},  # tool -> {"calls", "seconds"}
+        "cache_hits": 0,
+        "cache_misses": 0,
+        "revisions": 0,
+        "cost_usd": 0.0,
+        "updated": time.time(),
+    }
+
+def _new_node():
+    return {
+        "runs": 0, "seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0,
+        "llm_calls": 0, "cached_calls": 0, "errors": 0, "model": None,
+    }
+
+def _labels(**labels):
+    escaped = {key: str(value).replace("\\", "\\\\").replace('"', '\\"') for key, value in labels.items()}
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped.items()) + "}"
+
+
+class GraphMetrics(BaseCallbackHandler):
+    """Callback handler that accounts time, tokens, cost and cache use per thread and node.
+
+    Attach it to the compiled graph with graph.with_config(callbacks=[metrics]).
+    Node and tool timings come from LangGraph's chain and tool callbacks; cache
+    hits arrive through cache_listener(), which the LLM and search caches call
+    on every lookup. Finished nodes are queued and, every export_seconds, a
+    background thread appends them to log_path as JSON lines and rewrites the
+    Prometheus text in prom_path.
+    """
+
+    # Handlers only update counters under a lock, so run them inline on the event loop too
+    run_inline = True
+
+    def __init__(
+        self, log_path=METRICS_LOG, prom_path=METRICS_PROM_PATH, max_threads=METRICS_MAX_THREADS,
+        export_seconds=METRICS_EXPORT_SECONDS, log_max_bytes=int(METRICS_LOG_MAX_MB * 2 ** 20),
+    ):
+        self.log_path = log_path
+        self.prom_path = prom_path
+        self.max_threads = max_threads
+        self.export_seconds = export_seconds
+        self.log_max_bytes = log_max_bytes
+        self.threads = OrderedDict()
+        # Callables returning {name: (help, value)} for process-wide gauges added to prometheus()
+        self.gauges = []
+        self._runs = {}  # run_id -> (kind, thread_id, name, started)
+        self._lock = threading.Lock()
+        self._pending = []  # node events not yet appended to log_path
+        self._dirty = False  # counters changed since prom_path was last written
+        self._exporter = None
+        # Serializes file writes between the exporter thread and flush() callers
+        self._export_lock = threading.Lock()
+        for path in (log_path, prom_path):
+            if path and os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def _thread(self, thread_id):
+        """Counters for thread_id, evicting the least recently updated threads; caller holds the lock"""
+        thread = self.threads.get(thread_id)
+        if thread is None:
+            thread = self.threads[thread_id] = _new_thread()
+            while len(self.threads) > self.max_threads:
+                self.threads.popitem(last=False)
+        thread["updated"] = time.time()
+        self.threads.move_to_end(thread_id)
+        return thread
+
+    def _start(self, run_id, kind, metadata, name):
+        thread_id = (metadata or {}).get("thread_id", "unknown")
+        with self._lock:
+            self._runs[run_id] = (kind, thread_id, name, time.perf_counter())
+
+    def _finish(self, run_id, kind):
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is None or run[0] != kind:
+                return None
+            del self._runs[run_id]
+        return run[1], run[2], time.perf_counter() - run[3]
+
+    # Nodes
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        # The node's own run; runnables nested inside it carry the same metadata under other names
+        if node and kwargs.get("name") == node and self._runs.get(parent_run_id, ("",))[0] != "node":
+            self._start(run_id, "node", metadata, node)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._node_finished(run_id, None)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._node_finished(run_id, error)
+
+    def _node_finished(self, run_id, error):
+        finished = self._finish(run_id, "node")
+        if finished is None:
+            return
+        thread_id, node, seconds = finished
+        # human_review ends with GraphInterrupt every time it pauses; that is waiting, not failing
+        status = "ok" if error is None else ("interrupted" if type(error).__name__ == "GraphInterrupt" else "error")
+        with self._lock:
+            thread = self._thread(thread_id)
+            counters = thread["nodes"].setdefault(node, _new_node())
+            counters["runs"] += 1
+            counters["seconds"] += seconds
+            counters["errors"] += status == "error"
+            if node == "revise_outline":
+                thread["revisions"] += 1
+            event = {
+                "ts": time.time(),
+                "event": "node",
+                "thread_id": thread_id,
+                "node": node,
+                "status": status,
+                "seconds": round(seconds, 4),
+                "thread": self._summary(thread),
+            }
+            self._queue_export(event)
+
+    # LLM calls
+
+    def _llm_started(self, run_id, metadata):
+        metadata = metadata or {}
+        self._start(run_id, "llm", metadata, (metadata.get("langgraph_node", "unknown"), metadata.get("ls_model_name")))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._llm_started(run_id, metadata)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._llm_started(run_id, metadata)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        finished = self._finish(run_id, "llm")
+        if finished is None:
+            return
+        thread_id, (node, model), _ = finished
+        prompt_tokens, completion_tokens, cached = token_usage(response)
+        with self._lock:
+            thread = self._thread(thread_id)
+            counters = thread["nodes"].setdefault(node, _new_node())
+            counters["llm_calls"] += 1
+            counters["cached_calls"] += cached
+            counters["model"] = model
+            counters["prompt_tokens"] += prompt_tokens
+            counters["completion_tokens"] += completion_tokens
+            thread["cost_usd"] += cost_usd(model, prompt_tokens, completion_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, "llm")
+
+    # Tools
+
+    def on_tool_start(self, serialized, input_str, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, "tool", metadata, kwargs.get("name") or (serialized or {}).get("name", "tool"))
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._tool_finished(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._tool_finished(run_id)
+
+    def _tool_finished(self, run_id):
+        finished = self._finish(run_id, "tool")
+        if finished is None:
+            return
+        thread_id, tool, seconds = finished
+        with self._lock:
+            counters = self._thread(thread_id)["tools"].setdefault(tool, {"calls": 0, "seconds": 0.0})
+            counters["calls"] += 1
+            counters["seconds"] += seconds
+
+    # Caches
+
+    def cache_listener(self, hit):
+        """Record one cache lookup for the thread whose node made it"""
+        current = _current_run()
+        if current is None:
+            return
+        with self._lock:
+            thread = self._thread(current[0])
+            thread["cache_hits" if hit else "cache_misses"] += 1
+
+    # Export
+
+    @staticmethod
+    def _summary(thread):
+        nodes = thread["nodes"].values()
+        return {
+            "seconds": round(sum(n["seconds"] for n in nodes), 4),
+            "prompt_tokens": sum(n["prompt_tokens"] for n in nodes),
+            "completion_tokens": sum(n["completion_tokens"] for n in nodes),
+            "cost_usd": round(thread["cost_usd"], 6),
+            "cache_hits": thread["cache_hits"],
+            "cache_misses": thread["cache_misses"],
+            "revisions": thread["revisions"],
+        }
+
+    def thread_report(self, thread_id):
+        """Totals and per-node/per-tool breakdown for one thread, or None if nothing was recorded"""
+        with self._lock:
+            thread = self.threads.get(thread_id)
+            if thread is None:
+                return None
+            return {
+                **self._summary(thread),
+                "nodes": {node: dict(counters) for node, counters in thread["nodes"].items()},
+                "tools": {tool: dict(counters) for tool, counters in thread["tools"].items()},
+            }
+
+    def prometheus(self):
+        """All counters in the Prometheus text exposition format"""
+        metrics = {
+            "blog_node_runs_total": ("counter", "Node executions", []),
+            "blog_node_seconds_total": ("counter", "Wall time spent in the node", []),
+            "blog_node_errors_total": ("counter", "Node executions that raised", []),
+            "blog_llm_calls_total": ("counter", "LLM requests", []),
+            "blog_llm_cached_calls_total": ("counter", "LLM requests answered from the cache", []),
+            "blog_llm_tokens_total": ("counter", "LLM tokens by kind", []),
+            "blog_llm_cost_usd_total": ("counter", "Estimated LLM cost in USD", []),
+            "blog_tool_calls_total": ("counter", "Tool calls", []),
+            "blog_tool_seconds_total": ("counter", "Wall time spent in tools", []),
+            "blog_cache_lookups_total": ("counter", "LLM and search cache lookups by result", []),
+            "blog_revisions_total": ("counter", "Outline revision loops", []),
+        }
+        with self._lock:
+            for thread_id, thread in self.threads.items():
+                for node, n in thread["nodes"].items():
+                    labels = _labels(thread_id=thread_id, node=node)
+                    metrics["blog_node_runs_total"][2].append((labels, n["runs"]))
+                    metrics["blog_node_seconds_total"][2].append((labels, round(n["seconds"], 4)))
+                    metrics["blog_node_errors_total"][2].append((labels, n["errors"]))
+                    metrics["blog_llm_calls_total"][2].append((labels, n["llm_calls"]))
+                    metrics["blog_llm_cached_calls_total"][2].append((labels, n["cached_calls"]))
+                    for kind in ("prompt", "completion"):
+                        metrics["blog_llm_tokens_total"][2].append(
+                            (_labels(thread_id=thread_id, node=node, kind=kind), n[f"{kind}_tokens"])
+                        )
+                for tool, t in thread["tools"].items():
+                    labels = _labels(thread_id=thread_id, tool=tool)
+                    metrics["blog_tool_calls_total"][2].append((labels, t["calls"]))
+                    metrics["blog_tool_seconds_total"][2].append((labels, round(t["seconds"], 4)))
+                labels = _labels(thread_id=thread_id)
+                metrics["blog_llm_cost_usd_total"][2].append((labels, round(thread["cost_usd"], 6)))
+                metrics["blog_revisions_total"][2].append((labels, thread["revisions"]))
+                for result in ("hit", "miss"):
+                    metrics["blog_cache_lookups_total"][2].append(
+                        (_labels(thread_id=thread_id, result=result), thread["cache_hits" if result == "hit" else "cache_misses"])
+                    )
+
+        for source in self.gauges:
+            for name, (help_text, value) in source().items():
+                # Sources report running totals next to point-in-time values; the name says which
+                metrics[name] = ("counter" if name.endswith("_total") else "gauge", help_text, [("", value)])
+
+        lines = []
+        for name, (kind, help_text, samples) in metrics.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{labels} {value}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+    def _queue_export(self, event):
+        """Queue a node event and start the exporter thread on first use; caller holds the lock"""
+        if not (self.log_path or self.prom_path):
+            return
+        if self.log_path:
+            self._pending.append(event)
+        self._dirty = True
+        if self._exporter is None:
+            self._exporter = threading.Thread(target=self._export_loop, name="metrics-export", daemon=True)
+            self._exporter.start()
+            # Whatever the last interval collected is written when the process exits
+            atexit.register(self.flush)
+
+    def _export_loop(self):
+        while True:
+            time.sleep(self.export_seconds)
+            try:
+                self.flush()
+            except OSError:
+                # A full disk or a removed directory must not stop later exports
+                pass
+
+    def flush(self):
+        """Write queued node events to log_path and the current counters to prom_path"""
+        with self._export_lock:
+            with self._lock:
+                events, self._pending = self._pending, []
+                dirty, self._dirty = self._dirty, False
+            if not dirty:
+                return
+            if events:
+                if self.log_max_bytes and os.path.exists(self.log_path) and os.path.getsize(self.log_path) >= self.log_max_bytes:
+                    os.replace(self.log_path, f"{self.log_path}.1")
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(event) + "\n" for event in events)
+            if self.prom_path:
+                text = self.prometheus()
+                # Write then rename so a scraper never reads a half-written file
+                tmp_path = f"{self.prom_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(text)
+                os.replace(tmp_path, self.prom_path)
@@ -0,0 +1,97 @@
+import re
+
+# Markdown headers ("## Introduction")
+MARKDOWN_HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+# Numbered or bold top-level lines ("1. Introduction", "II) Market data", "**Conclusion**")
+PLAIN_HEADING = re.compile(r"^(?:\*\*\s*)?(?:\d+|[IVXLC]+)[.)]\s+\S|^\*\*[^*].*\*\*:?$")
+
+def _clean_heading(line):
+    """Strip markdown markers from a heading line"""
+    heading = MARKDOWN_HEADING.sub(r"\2", line.strip())
+    return heading.strip("*: ").strip()
+
+def _is_title(heading):
+    return heading.lower().startswith(("blog title", "title:", "blog outline", "outline"))
+
+def parse_sections(outline):
+    """Split an outline into its top-level sections.
+
+    Returns a list of {"heading": str, "body": str} dicts, where body holds the
+    heading line and every line below it up to the next top-level heading.
+    Any preamble such as the blog title is dropped. Outlines without a
+    recognisable structure come back as an empty list.
+    """
+    lines = (outline or "").splitlines()
+
+    # Prefer markdown headers; use the shallowest level that appears more than once
+    levels = [len(m.group(1)) for m in map(MARKDOWN_HEADING.match, lines) if m]
+    repeated = sorted(level for level in set(levels) if levels.count(level) > 1)
+    if repeated:
+        def is_heading(line):
+            match = MARKDOWN_HEADING.match(line)
+            return bool(match) and len(match.group(1)) == repeated[0]
+    else:
+        # Only lines without indentation count, so nested bullets stay in their section
+        def is_heading(line):
+            return bool(PLAIN_HEADING.match(line))
+
+    sections = []
+    for line in lines:
+        if is_heading(line) and not _is_title(_clean_heading(line)):
+            sections.append({"heading": _clean_heading(line), "lines": [line]})
+        elif sections:
+            sections[-1]["lines"].append(line)
+
+    return [
+        {"heading": section["heading"], "body": "\n".join(section["lines"]).strip()}
+        for section in sections
+    ]
+
+# Feedback about the outline as a whole rather than about particular sections
+STRUCTURAL_FEEDBACK = re.compile(
+    r"\b(?:add|adding|remove|drop|delete|reorder|rearrange|merge|combine|split|restructure|structure|"
+    r"order|overall|whole|entire|every|all|title|more sections|fewer sections|new section)\b",
+    re.IGNORECASE,
+)
+STOPWORDS = frozenset(
+    "about also and are but for from have into its less make more much not only section sections should "
+    "that the their them then there these this those too very what when with would your".split()
+)
+
+def _keywords(text):
+    # Crude singular form, so "risks" in the feedback matches a "Risk" heading
+    return {word.rstrip("s") for word in re.findall(r"[a-z0-9]+", text.lower()) if len(word) > 3 and word not in STOPWORDS}
+
+def feedback_targets(sections, feedback):
+    """Indexes of the sections feedback is about, or None when the whole outline should be revised.
+
+    A section is targeted when the feedback names it by number ("section 2")
+    or shares a keyword with its heading. Feedback about the structure (adding,
+    removing or reordering sections), feedback naming no section and feedback
+    touching every section all ask for a full revision.
+    """
+    if len(sections) < 2 or not feedback.strip() or STRUCTURAL_FEEDBACK.search(feedback):
+        return None
+    numbers = {int(n) for n in re.findall(r"\bsection\s+(\d+)\b", feedback, re.IGNORECASE)}
+    words = _keywords(feedback)
+    targets = [
+        index for index, section in enumerate(sections)
+        if index + 1 in numbers or _keywords(section["heading"]) & words
+    ]
+    return targets if targets and len(targets) < len(sections) else None
+
+def replace_sections(outline, sections, replacements):
+    """outline with the bodies of sections[index] swapped for replacements[index].
+
+    Returns None if a section body cannot be found verbatim in the outline.
+    """
+    for index, body in replacements.items():
+        original = sections[index]["body"]
+        if original not in outline:
+            return None
+        first_line = body.strip().splitlines()[0] if body.strip() else ""
+        # Keep the section's own heading line when the model left it out
+        if _clean_heading(first_line) != sections[index]["heading"] and not MARKDOWN_HEADING.match(first_line):
+            body = f"{original.splitlines()[0]}\n{body.strip()}"
+        outline = outline.replace(original, body.strip(), 1)
+    return outline
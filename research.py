@@ -0,0 +1,84 @@
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+# One sub-query per angle of the topic
+QUERY_TEMPLATES = (
+    "{topic} latest statistics and data",
+    "{topic} recent news",
+    "{topic} background and overview",
+)
+
+def expand_queries(topic, templates=QUERY_TEMPLATES):
+    return [template.format(topic=topic) for template in templates]
+
+def normalize_url(url):
+    """Scheme, www, fragment and trailing slash insensitive form of a URL"""
+    parts = urlsplit(url.strip().lower())
+    host = parts.netloc[4:] if parts.netloc.startswith("www.") else parts.netloc
+    query = f"?{parts.query}" if parts.query else ""
+    return f"{host}{parts.path.rstrip('/')}{query}"
+
+def content_hash(text):
+    return hashlib.sha1(" ".join(text.lower().split()).encode("utf-8")).hexdigest()
+
+def run_queries(search, queries, concurrency=3):
+    """Run search(query) for every query on a bounded thread pool.
+
+    Returns one result list per query, in query order. A failing query
+    contributes no results rather than failing the whole research step.
+    """
+    def safe_search(query):
+        try:
+            return search(query)
+        except Exception:
+            return []
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(queries)))) as pool:
+        return list(pool.map(safe_search, queries))
+
+async def arun_queries(asearch, queries, concurrency=3):
+    """Async counterpart of run_queries, awaiting at most concurrency searches at once"""
+    slots = asyncio.Semaphore(max(1, concurrency))
+
+    async def safe_search(query):
+        async with slots:
+            try:
+                return await asearch(query)
+            except Exception:
+                return []
+
+    return list(await asyncio.gather(*(safe_search(query) for query in queries)))
+
+def dedupe_and_rank(result_lists, limit=8):
+    """Merge search results, dropping repeats by URL or content.
+
+    Results found by more queries rank first, then by the search engine's own
+    relevance score.
+    """
+    merged = {}
+    seen_content = {}
+    for results in result_lists:
+        for result in results:
+            url_key = normalize_url(result.get("url", ""))
+            # Results without a snippet have nothing to compare, so only their URL identifies them
+            digest = content_hash(result["content"]) if (result.get("content") or "").strip() else None
+            key = seen_content.get(digest, url_key) if digest else url_key
+            if key in merged:
+                merged[key]["hits"] += 1
+                merged[key]["score"] = max(merged[key]["score"], result.get("score") or 0)
+                continue
+            merged[key] = {**result, "score": result.get("score") or 0, "hits": 1}
+            if digest:
+                seen_content[digest] = key
+
+    ranked = sorted(merged.values(), key=lambda r: (r["hits"], r["score"]), reverse=True)
+    return ranked[:limit]
+
+def format_results(results):
+    """Render ranked results as plain text for an extraction prompt"""
+    return "\n\n".join(
+        f"Source: {result.get('title') or result.get('url')} ({result.get('url')})\n{result.get('content', '')}"
+        for result in results
+    )
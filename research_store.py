@@ -0,0 +1,227 @@
+import argparse
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from research import normalize_url
+
+load_dotenv()
+
+# Empty disables the store; every search then goes to the web
+RESEARCH_STORE_PATH = os.getenv("RESEARCH_STORE", ".cache/research.sqlite")
+# Stored results older than this do not count as coverage and are fetched again
+RESEARCH_STORE_MAX_AGE_HOURS = float(os.getenv("RESEARCH_STORE_MAX_AGE_HOURS", "72"))
+# Documents older than this are deleted by `python research_store.py prune`
+RESEARCH_STORE_RETENTION_DAYS = float(os.getenv("RESEARCH_STORE_RETENTION_DAYS", "30"))
+
+# Words that say nothing about coverage; every other query word must appear in a stored document
+STOPWORDS = frozenset(
+    "a about an and are as at be by for from how in into is it its of on or the this to what when where which who why with"
+    .split()
+)
+
+def match_expression(query):
+    """FTS5 query requiring every significant word of query, or None if nothing is left to match"""
+    terms = [term for term in re.findall(r"\w+", query.lower()) if term not in STOPWORDS]
+    return " ".join(f'"{term}"' for term in dict.fromkeys(terms)) or None
+
+
+class ResearchStore:
+    """Persistent full-text index of search results and research notes.
+
+    Every result fetched from the web is stored once per source URL together
+    with the topic (the query that found it) and its fetch time; research notes
+    are stored per blog topic. search() answers from the index when it already
+    holds max_results documents younger than max_age_seconds that contain every
+    significant query word, and only calls the web backend otherwise.
+    """
+
+    def __init__(self, path, backend=None, async_backend=None, max_age_seconds=72 * 3600):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.backend = backend
+        self.async_backend = async_backend
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        # Callables notified with True/False on every lookup (answered locally/sent to the web)
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript(
+                """CREATE TABLE IF NOT EXISTS documents (
+                    id INTEGER PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL UNIQUE,
+                    topic TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    score REAL NOT NULL,
+                    fetched_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS documents_fetched ON documents (fetched_at);
+                CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+                    topic, title, content, content='documents', content_rowid='id'
+                );
+                CREATE TRIGGER IF NOT EXISTS documents_ai AFTER INSERT ON documents BEGIN
+                    INSERT INTO documents_fts (rowid, topic, title, content)
+                    VALUES (new.id, new.topic, new.title, new.content);
+                END;
+                CREATE TRIGGER IF NOT EXISTS documents_ad AFTER DELETE ON documents BEGIN
+                    INSERT INTO documents_fts (documents_fts, rowid, topic, title, content)
+                    VALUES ('delete', old.id, old.topic, old.title, old.content);
+                END;"""
+            )
+
+    def _notify(self, hit):
+        for listener in self.listeners:
+            listener(hit)
+
+    def _upsert(self, kind, key, topic, url, title, content, score, now):
+        """Replace the document stored under key; caller holds the lock"""
+        # Delete and insert rather than update, so the triggers keep the full-text index in step
+        self._conn.execute("DELETE FROM documents WHERE key = ?", (key,))
+        self._conn.execute(
+            "INSERT INTO documents (kind, key, topic, url, title, content, score, fetched_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (kind, key, topic, url, title, content, score, now),
+        )
+
+    def add_results(self, topic, results):
+        """Index search results found for topic, keeping the newest copy of each source URL"""
+        now = time.time()
+        with self._lock, self._conn:
+            for result in results:
+                if not result.get("url"):
+                    continue
+                self._upsert(
+                    "result", normalize_url(result["url"]), topic, result["url"],
+                    result.get("title") or "", result.get("content") or "", result.get("score") or 0, now,
+                )
+
+    def add_notes(self, topic, notes):
+        """Index the research notes extracted for a blog topic"""
+        if not topic.strip() or not notes.strip():
+            return
+        with self._lock, self._conn:
+            self._upsert("notes", f"notes:{' '.join(topic.lower().split())}", topic, "", topic, notes, 0, time.time())
+
+    def lookup(self, query, limit=3, kind="result", max_age_seconds=None):
+        """Stored documents of kind matching every significant word of query, best match first"""
+        expression = match_expression(query)
+        if expression is None:
+            return []
+        max_age = self.max_age_seconds if max_age_seconds is None else max_age_seconds
+        oldest = time.time() - max_age if max_age else 0
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT d.title, d.url, d.content, d.score, d.topic, d.fetched_at
+                FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid
+                WHERE documents_fts MATCH ? AND d.kind = ? AND d.fetched_at >= ?
+                ORDER BY bm25(documents_fts) LIMIT ?""",
+                (expression, kind, oldest, limit),
+            ).fetchall()
+        return [
+            {"title": title, "url": url, "content": content, "score": score, "topic": topic, "fetched_at": fetched_at}
+            for title, url, content, score, topic, fetched_at in rows
+        ]
+
+    def _covered(self, query, max_results):
+        """Stored results that fully answer query, or None when the web has to be asked"""
+        stored = self.lookup(query, max_results)
+        if len(stored) < max_results:
+            with self._lock:
+                self.misses += 1
+            self._notify(False)
+            return None
+        with self._lock:
+            self.hits += 1
+        self._notify(True)
+        # Same fields as a web result, so callers cannot tell the difference
+        return [{key: result[key] for key in ("title", "url", "content", "score")} for result in stored]
+
+    def search(self, query, max_results=3):
+        stored = self._covered(query, max_results)
+        if stored is not None:
+            return stored
+        results = self.backend(query, max_results)
+        self.add_results(query, results)
+        return results
+
+    async def asearch(self, query, max_results=3):
+        if self.async_backend is None:
+            return await asyncio.to_thread(self.search, query, max_results)
+        stored = await asyncio.to_thread(self._covered, query, max_results)
+        if stored is not None:
+            return stored
+        results = await self.async_backend(query, max_results)
+        await asyncio.to_thread(self.add_results, query, results)
+        return results
+
+    def prune(self, older_than_seconds):
+        """Delete documents fetched more than older_than_seconds ago; returns how many"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM documents WHERE fetched_at < ?", (time.time() - older_than_seconds,))
+        return cursor.rowcount
+
+    def stats(self):
+        """Hit/miss counters for this process plus the stored documents by kind"""
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT kind, COUNT(*) FROM documents GROUP BY kind"))
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "results": counts.get("result", 0),
+            "notes": counts.get("notes", 0),
+        }
+
+    def gauges(self):
+        """Store state for GraphMetrics.gauges"""
+        stats = self.stats()
+        return {
+            "blog_research_store_hits_total": ("Searches answered from the local research store", stats["hits"]),
+            "blog_research_store_misses_total": ("Searches sent to the web", stats["misses"]),
+            "blog_research_store_results": ("Search results in the local research store", stats["results"]),
+            "blog_research_store_notes": ("Research notes in the local research store", stats["notes"]),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query and maintain the local research store")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    search_parser = subcommands.add_parser("search", help="Full-text search over stored results or notes")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--notes", action="store_true", help="Search research notes instead of results")
+    search_parser.add_argument("-n", "--limit", type=int, default=5)
+    search_parser.add_argument("--any-age", action="store_true", help="Include results past the freshness limit")
+    prune_parser = subcommands.add_parser("prune", help="Delete documents older than the retention period")
+    prune_parser.add_argument("--days", type=float, default=RESEARCH_STORE_RETENTION_DAYS)
+    subcommands.add_parser("stats")
+    args = parser.parse_args()
+
+    if not RESEARCH_STORE_PATH:
+        parser.error("RESEARCH_STORE is not set")
+    store = ResearchStore(RESEARCH_STORE_PATH, max_age_seconds=RESEARCH_STORE_MAX_AGE_HOURS * 3600)
+
+    if args.command == "search":
+        found = store.lookup(
+            args.query, args.limit, kind="notes" if args.notes else "result", max_age_seconds=0 if args.any_age else None
+        )
+        for document in found:
+            fetched = time.strftime("%Y-%m-%d %H:%M", time.localtime(document["fetched_at"]))
+            print(f"{document['title']}  {document['url']}\n  topic: {document['topic']}  fetched: {fetched}")
+            print(f"  {document['content'][:200]}\n")
+    elif args.command == "prune":
+        print(f"Removed {store.prune(args.days * 86400)} documents")
+    else:
+        print(store.stats())
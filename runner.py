@@ -0,0 +1,80 @@
+import collections
+import threading
+import time
+
+from graph import stream_graph
+
+# Streamed text kept for the live view; a long-form run only shows its most recent part
+STREAM_TEXT_MAX_CHARS = 40000
+
+class GraphRun:
+    """Runs the graph on a background thread and records per-node progress.
+
+    The worker thread only updates plain Python attributes, so the Streamlit
+    script can poll a GraphRun kept in st.session_state without blocking.
+    """
+
+    def __init__(self, graph_input, config):
+        self.nodes = {}  # node name -> {"started", "finished", "tasks", "waiting"}
+        self.tokens = collections.deque()
+        self.token_chars = 0
+        self.trimmed = False
+        self.result = None
+        self.error = None
+        self.started = time.monotonic()
+        self.finished = None
+        self._thread = threading.Thread(target=self._run, args=(graph_input, config), daemon=True)
+        self._thread.start()
+
+    @property
+    def done(self):
+        return self.finished is not None
+
+    def _run(self, graph_input, config):
+        try:
+            self.result = stream_graph(graph_input, config, on_token=self._on_token, on_task=self._on_task)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished = time.monotonic()
+
+    def _on_token(self, node, text):
+        self.tokens.append(text)
+        self.token_chars += len(text)
+        while self.token_chars > STREAM_TEXT_MAX_CHARS and len(self.tokens) > 1:
+            self.token_chars -= len(self.tokens.popleft())
+            self.trimmed = True
+
+    def _on_task(self, event):
+        now = time.monotonic()
+        node = self.nodes.setdefault(event["name"], {"started": now, "finished": None, "tasks": 0, "waiting": False})
+        if "input" in event:
+            # Parallel branches (section_writer) and revision loops reuse the node's entry
+            if node["tasks"] == 0 and node["finished"] is not None:
+                node.update(started=now, finished=None)
+            node["tasks"] += 1
+        else:
+            node["tasks"] -= 1
+            node["waiting"] = bool(event.get("interrupts"))
+            if node["tasks"] == 0:
+                node["finished"] = now
+
+    def node_progress(self):
+        """(node, status, seconds) in the order nodes started; status is running, waiting or done"""
+        now = time.monotonic()
+        progress = []
+        for name, node in sorted(list(self.nodes.items()), key=lambda item: item[1]["started"]):
+            if node["waiting"]:
+                status = "waiting"
+            else:
+                status = "done" if node["finished"] is not None else "running"
+            progress.append((name, status, (node["finished"] or now) - node["started"]))
+        return progress
+
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    def streamed_text(self):
+        # list() copies the deque in one step, so a token arriving meanwhile cannot break the join
+        text = "".join(list(self.tokens))
+        return f"…{text}" if self.trimmed else text
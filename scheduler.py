@@ -0,0 +1,202 @@
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.rate_limiters import BaseRateLimiter
+
+from metrics import token_usage
+
+# Lower rank is served first; calls made outside a graph run (speculative drafts) count as batch
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+def current_priority():
+    """Priority class of the graph run making the call, from config["configurable"]["priority"]"""
+    from langgraph.config import get_config
+
+    try:
+        priority = get_config().get("configurable", {}).get("priority", "interactive")
+    except RuntimeError:
+        return "batch"
+    return priority if priority in PRIORITIES else "interactive"
+
+
+class TokenBucket:
+    """Refills at rate_per_minute up to burst_seconds worth of capacity; the level may go negative"""
+
+    def __init__(self, rate_per_minute, burst_seconds=10, clock=time.monotonic):
+        self.rate = rate_per_minute / 60
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.clock = clock
+        self._updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, amount=1):
+        """Seconds until amount can be taken"""
+        self._refill()
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount=1):
+        self._refill()
+        self.level -= amount
+
+
+class LLMScheduler(BaseRateLimiter):
+    """Rate limiter for chat models with request and token budgets and priority classes.
+
+    Set it as the model's rate_limiter and add usage_handler to the model's
+    callbacks. Every request that misses the LLM cache takes one request from
+    a requests-per-minute bucket; tokens are unknown until the reply arrives, so
+    the tokens-per-minute bucket is charged afterwards and new requests wait
+    while it is in debt. Waiting requests are granted strictly by priority
+    class, then arrival order. throttle() pauses all grants after a 429.
+    """
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0, burst_seconds=10, poll_seconds=0.05, clock=time.monotonic):
+        self.clock = clock
+        self.requests = TokenBucket(requests_per_minute, burst_seconds, clock) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, burst_seconds, clock) if tokens_per_minute else None
+        self.poll_seconds = poll_seconds
+        self.usage_handler = _UsageHandler(self)
+        self.granted = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self._waiting = []  # heap of (rank, seq, priority)
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+
+    def _delay(self):
+        """Seconds until the next request may be sent; caller holds the lock"""
+        delay = max(0.0, self._paused_until - self.clock())
+        if self.requests is not None:
+            delay = max(delay, self.requests.delay())
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.delay())
+        return delay
+
+    def _enqueue(self):
+        priority = current_priority()
+        ticket = (PRIORITIES[priority], next(self._seq), priority)
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+        return ticket, self.clock()
+
+    def _try_grant(self, ticket, started):
+        """Grant ticket if it is first in line and the budgets allow; otherwise the seconds to wait"""
+        if self._waiting[0] is not ticket:
+            return None
+        delay = self._delay()
+        if delay > 0:
+            return delay
+        heapq.heappop(self._waiting)
+        if self.requests is not None:
+            self.requests.take()
+        waited = self.clock() - started
+        self.granted += 1
+        self.wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        self._cond.notify_all()
+        return 0.0
+
+    def _leave(self, ticket):
+        with self._cond:
+            if ticket in self._waiting:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+    def acquire(self, *, blocking=True):
+        ticket, started = self._enqueue()
+        with self._cond:
+            while True:
+                delay = self._try_grant(ticket, started)
+                if delay == 0:
+                    return True
+                if not blocking:
+                    break
+                # Behind another request: woken when it is granted; first in line: wait out the budget
+                self._cond.wait(delay)
+        self._leave(ticket)
+        return False
+
+    async def aacquire(self, *, blocking=True):
+        ticket, started = self._enqueue()
+        granted = False
+        try:
+            while True:
+                with self._cond:
+                    delay = self._try_grant(ticket, started)
+                if delay == 0:
+                    granted = True
+                    return True
+                if not blocking:
+                    return False
+                await asyncio.sleep(self.poll_seconds if delay is None else delay)
+        finally:
+            if not granted:
+                self._leave(ticket)
+
+    def record_tokens(self, tokens):
+        """Charge tokens used by a finished request to the tokens-per-minute budget"""
+        if self.tokens is not None and tokens:
+            with self._cond:
+                self.tokens.take(tokens)
+
+    def throttle(self, retry_after=None):
+        """Hold back every queued request after a 429, for retry_after seconds plus jitter"""
+        pause = (retry_after or 2.0) * random.uniform(1.0, 1.25)
+        with self._cond:
+            self.throttled += 1
+            self._paused_until = max(self._paused_until, self.clock() + pause)
+
+    def stats(self):
+        with self._cond:
+            queued = {priority: 0 for priority in PRIORITIES}
+            for _, _, priority in self._waiting:
+                queued[priority] += 1
+            return {
+                "queued": queued,
+                "granted": self.granted,
+                "throttled": self.throttled,
+                "avg_wait_seconds": self.wait_seconds / self.granted if self.granted else 0.0,
+                "max_wait_seconds": self.max_wait_seconds,
+                "next_slot_seconds": self._delay(),
+            }
+
+    def gauges(self):
+        """Scheduler state for GraphMetrics.gauges"""
+        stats = self.stats()
+        return {
+            **{
+                f"blog_llm_queue_{priority}": (f"{priority.capitalize()} LLM requests waiting for quota", depth)
+                for priority, depth in stats["queued"].items()
+            },
+            "blog_llm_granted_total": ("LLM requests let through by the scheduler", stats["granted"]),
+            "blog_llm_throttled_total": ("Rate limit responses from the provider", stats["throttled"]),
+            "blog_llm_wait_seconds_avg": ("Average wait for quota", round(stats["avg_wait_seconds"], 4)),
+            "blog_llm_wait_seconds_max": ("Longest wait for quota", round(stats["max_wait_seconds"], 4)),
+        }
+
+
+class _UsageHandler(BaseCallbackHandler):
+    """Feeds the token usage of every uncached reply back into its scheduler"""
+
+    run_inline = True
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+
+    def on_llm_end(self, response, **kwargs):
+        prompt_tokens, completion_tokens, cached = token_usage(response)
+        if not cached:
+            self.scheduler.record_tokens(prompt_tokens + completion_tokens)
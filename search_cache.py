@@ -0,0 +1,161 @@
+import asyncio
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from langchain_core.tools import StructuredTool
+from pydantic import BaseModel, Field
+
+
+class SearchInput(BaseModel):
+    """Input for the search tool."""
+
+    query: str = Field(description="search query to look up")
+
+
+class SearchCache:
+    """TTL cache in front of a web search backend.
+
+    backend(query, max_results) must return a list of result dicts, and the
+    optional async_backend is its coroutine counterpart. Results are cached per
+    normalized query and max_results, and concurrent identical queries share a
+    single upstream call instead of each hitting the backend.
+    """
+
+    def __init__(self, backend, async_backend=None, ttl_seconds=900, max_entries=500, clock=time.monotonic):
+        self.backend = backend
+        self.async_backend = async_backend
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        # Callables notified with True/False on every lookup; a coalesced lookup counts as a hit
+        self.listeners = []
+        self._entries = OrderedDict()
+        self._inflight = {}
+        # asyncio futures can only be awaited on their own loop, so track them per loop
+        self._async_inflight = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(query):
+        """Case and whitespace insensitive form of a query, ignoring trailing punctuation"""
+        return " ".join(query.lower().split()).strip(" ?!.")
+
+    def _cached(self, key):
+        """Fresh cached results for key, or None; caller holds the lock"""
+        entry = self._entries.get(key)
+        if entry is not None and self.clock() - entry[0] <= self.ttl_seconds:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        return None
+
+    def _store(self, key, results):
+        """Cache results for key; caller holds the lock"""
+        self._entries[key] = (self.clock(), results)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _notify(self, hit):
+        for listener in self.listeners:
+            listener(hit)
+
+    def search(self, query, max_results=3):
+        key = (self.normalize(query), max_results)
+        with self._lock:
+            cached = self._cached(key)
+            if cached is not None:
+                self._notify(True)
+                return cached
+
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        self._notify(not owner)
+
+        if not owner:
+            return future.result()
+
+        try:
+            results = self.backend(query, max_results)
+        except BaseException as exc:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(exc)
+            raise
+
+        with self._lock:
+            self._store(key, results)
+            del self._inflight[key]
+        future.set_result(results)
+        return results
+
+    async def asearch(self, query, max_results=3):
+        if self.async_backend is None:
+            return await asyncio.to_thread(self.search, query, max_results)
+
+        key = (self.normalize(query), max_results)
+        inflight = self._async_inflight.setdefault(asyncio.get_running_loop(), {})
+        with self._lock:
+            cached = self._cached(key)
+            if cached is not None:
+                self._notify(True)
+                return cached
+            owner = key not in inflight
+            if owner:
+                self.misses += 1
+                inflight[key] = asyncio.ensure_future(self._afetch(key, query, max_results, inflight))
+            else:
+                self.coalesced += 1
+            task = inflight[key]
+        self._notify(not owner)
+        # Shielded so one cancelled caller does not cancel the search for everyone waiting on it
+        return await asyncio.shield(task)
+
+    async def _afetch(self, key, query, max_results, inflight):
+        try:
+            results = await self.async_backend(query, max_results)
+            with self._lock:
+                self._store(key, results)
+            return results
+        finally:
+            inflight.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "entries": len(self._entries),
+            }
+
+    def as_tool(self, name, description, max_results=3):
+        """Wrap the cache in a tool taking a single query argument"""
+        def run(query: str):
+            return self.search(query, max_results)
+
+        async def arun(query: str):
+            return await self.asearch(query, max_results)
+
+        return StructuredTool.from_function(
+            func=run,
+            coroutine=arun,
+            name=name,
+            description=description,
+            args_schema=SearchInput,
+        )
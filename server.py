@@ -0,0 +1,288 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import uuid
+
+from dotenv import load_dotenv
+from langgraph.types import Command
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+import graph
+
+load_dotenv()
+
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+# Seconds between SSE comments that keep idle streams open through proxies
+SERVER_KEEPALIVE_SECONDS = float(os.getenv("SERVER_KEEPALIVE_SECONDS", "15"))
+# Events of a run kept for clients that subscribe after it started
+SERVER_EVENT_BUFFER = int(os.getenv("SERVER_EVENT_BUFFER", "5000"))
+
+
+class ThreadRun:
+    """One graph run of a thread on the server's event loop, fanned out to SSE subscribers.
+
+    Events are kept in order so a client that connects mid-run first receives
+    what it missed; the list is capped at SERVER_EVENT_BUFFER, after which the
+    oldest token events are no longer replayed. Node and result events are
+    always kept. A run is registered in runs
+    before it starts, so concurrent requests for the same thread see it.
+    """
+
+    def __init__(self, thread_id):
+        self.thread_id = thread_id
+        self.events = []
+        self.subscribers = set()
+        self.task = None
+
+    def publish(self, event, data):
+        self.events.append((event, data))
+        if len(self.events) > SERVER_EVENT_BUFFER:
+            # Token text is the bulk of a run; a late subscriber still sees every node and the result
+            oldest_token = next((i for i, (kind, _) in enumerate(self.events) if kind == "token"), 0)
+            del self.events[oldest_token]
+        for queue in self.subscribers:
+            queue.put_nowait((event, data))
+
+    def subscribe(self):
+        queue = asyncio.Queue()
+        for item in self.events:
+            queue.put_nowait(item)
+        self.subscribers.add(queue)
+        return queue
+
+    def on_token(self, node, text):
+        self.publish("token", {"node": node, "text": text})
+
+    def on_task(self, event):
+        status = "started" if "input" in event else "finished"
+        self.publish("node", {"name": event["name"], "status": status})
+
+    async def run(self, graph_input):
+        config = {"configurable": {"thread_id": self.thread_id, "priority": "interactive"}}
+        try:
+            result = await graph.astream_graph(graph_input, config, on_token=self.on_token, on_task=self.on_task)
+            event, data = result_event(result)
+            self.publish(event, {"thread_id": self.thread_id, **data})
+        except Exception as e:
+            self.publish("error", {"error": str(e), "type": type(e).__name__})
+        finally:
+            self.close()
+
+    def start(self, graph_input):
+        self.task = asyncio.create_task(self.run(graph_input))
+
+    def close(self):
+        """Unregister the run, unless a newer run of the thread replaced it, and end every open stream"""
+        if runs.get(self.thread_id) is self:
+            del runs[self.thread_id]
+        # None tells every open stream that the run is over
+        for queue in self.subscribers:
+            queue.put_nowait(None)
+
+
+# thread_id -> ThreadRun for runs in progress
+runs = {}
+
+def result_event(result):
+    """("interrupt", review request) for a paused run, ("done", blog) for a finished one"""
+    if result.get("__interrupt__"):
+        return "interrupt", result["__interrupt__"][0].value
+    return "done", {
+        "blog_title": result.get("blog_title", ""),
+        "outline": result.get("outline", ""),
+        "blog_content": result.get("blog_content", ""),
+        "output_path": result.get("output_path", ""),
+    }
+
+def reserve_run(thread_id):
+    """Register a new ThreadRun for thread_id, or return None if one is already registered.
+
+    Handlers call this before their first await; the check and the
+    registration happen in one step on the event loop, so two concurrent
+    requests can never both start a run on the same thread.
+    """
+    if thread_id in runs:
+        return None
+    run = runs[thread_id] = ThreadRun(thread_id)
+    return run
+
+async def thread_state(thread_id):
+    """Status and results of a thread from its latest checkpoint; None if the thread does not exist"""
+    async_graph = await graph.get_async_graph()
+    snapshot = await async_graph.aget_state({"configurable": {"thread_id": thread_id}})
+    if not snapshot.values:
+        return None
+    interrupts = [interrupt.value for task in snapshot.tasks for interrupt in task.interrupts]
+    # A run reserved by a request that is still checking the thread has not started yet
+    if thread_id in runs and runs[thread_id].task is not None:
+        status = "running"
+    elif interrupts:
+        status = "waiting"
+    elif snapshot.next:
+        # A node failed or the server restarted mid-run; the checkpoint is kept for inspection
+        status = "stopped"
+    else:
+        status = "complete"
+    values = snapshot.values
+    return {
+        "thread_id": thread_id,
+        "status": status,
+        "blog_title": values.get("blog_title", ""),
+        "outline": values.get("outline", ""),
+        "blog_content": values.get("blog_content", ""),
+        "output_path": values.get("output_path", ""),
+        "review": interrupts[0] if interrupts else None,
+    }
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def read_json(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        return None
+    return body if isinstance(body, dict) else None
+
+# Endpoints
+
+async def create_thread(request):
+    body = await read_json(request)
+    if body is None or not str(body.get("topic", "")).strip():
+        return JSONResponse({"error": "Expected a JSON body with a non-empty topic"}, status_code=400)
+    thread_id = str(body.get("thread_id") or uuid.uuid4())
+    run = reserve_run(thread_id)
+    if run is None:
+        return JSONResponse({"error": f"Thread {thread_id} already exists"}, status_code=409)
+    try:
+        exists = await thread_state(thread_id) is not None
+    except BaseException:
+        run.close()
+        raise
+    if exists:
+        run.close()
+        return JSONResponse({"error": f"Thread {thread_id} already exists"}, status_code=409)
+    run.start(graph.new_blog_input(body["topic"].strip()))
+    return JSONResponse({"thread_id": thread_id, "status": "running"}, status_code=202)
+
+async def resume_thread(request):
+    thread_id = request.path_params["thread_id"]
+    body = await read_json(request)
+    if body is None or not isinstance(body.get("approved"), bool):
+        return JSONResponse({"error": "Expected a JSON body with approved (bool) and optional feedback"}, status_code=400)
+    run = reserve_run(thread_id)
+    if run is None:
+        return JSONResponse({"error": f"Thread {thread_id} is running, not waiting for review"}, status_code=409)
+    try:
+        state = await thread_state(thread_id)
+    except BaseException:
+        run.close()
+        raise
+    if state is None:
+        run.close()
+        return JSONResponse({"error": f"Unknown thread {thread_id}"}, status_code=404)
+    if state["status"] != "waiting":
+        run.close()
+        return JSONResponse({"error": f"Thread {thread_id} is {state['status']}, not waiting for review"}, status_code=409)
+    run.start(Command(resume={"approved": body["approved"], "feedback": str(body.get("feedback", ""))}))
+    return JSONResponse({"thread_id": thread_id, "status": "running"}, status_code=202)
+
+async def get_thread(request):
+    state = await thread_state(request.path_params["thread_id"])
+    if state is None:
+        return JSONResponse({"error": f"Unknown thread {request.path_params['thread_id']}"}, status_code=404)
+    return JSONResponse(state)
+
+async def stream_thread(request):
+    """SSE stream of the thread's current run: node, token, then interrupt, done or error.
+
+    Without a run in progress the stream sends the thread's latest interrupt,
+    done or (for a stopped thread) error event and ends, so clients can always
+    subscribe right after a POST.
+    """
+    thread_id = request.path_params["thread_id"]
+    run = runs.get(thread_id)
+    if run is None:
+        state = await thread_state(thread_id)
+        if state is None:
+            return JSONResponse({"error": f"Unknown thread {thread_id}"}, status_code=404)
+
+        async def finished():
+            if state["review"] is not None:
+                yield sse("interrupt", {"thread_id": thread_id, **state["review"]})
+            elif state["status"] == "stopped":
+                yield sse("error", {
+                    "thread_id": thread_id, "error": "The thread's last run stopped before it finished", "type": "stopped",
+                })
+            else:
+                yield sse("done", {key: state[key] for key in ("thread_id", "blog_title", "outline", "blog_content", "output_path")})
+
+        return StreamingResponse(finished(), media_type="text/event-stream")
+
+    queue = run.subscribe()
+
+    async def events():
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), SERVER_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if item is None:
+                    return
+                yield sse(*item)
+        finally:
+            run.subscribers.discard(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+async def prometheus_metrics(request):
+    return PlainTextResponse(graph.metrics.prometheus(), media_type="text/plain; version=0.0.4")
+
+async def health(request):
+    return JSONResponse({"status": "ok", "runs": len(runs)})
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    for run in list(runs.values()):
+        if run.task is not None:
+            run.task.cancel()
+    await graph.close_async_graph()
+
+app = Starlette(
+    routes=[
+        Route("/threads", create_thread, methods=["POST"]),
+        Route("/threads/{thread_id}", get_thread, methods=["GET"]),
+        Route("/threads/{thread_id}/stream", stream_thread, methods=["GET"]),
+        Route("/threads/{thread_id}/resume", resume_thread, methods=["POST"]),
+        Route("/metrics", prometheus_metrics, methods=["GET"]),
+        Route("/health", health, methods=["GET"]),
+    ],
+    lifespan=lifespan,
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the blog graph over HTTP with server-sent events")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--fake", action="store_true",
+                        help="Use the deterministic fake LLM and search backends from fakes.py (no API keys needed)")
+    args = parser.parse_args()
+
+    if args.fake:
+        from fakes import FakeChatModel, FakeSearch
+
+        search = FakeSearch()
+        graph.use_backends(chat=FakeChatModel(), search=search, async_search=search.asearch)
+    # One worker: every session shares this event loop and the pooled upstream clients in clients.py
+    uvicorn.run(app, host=args.host, port=args.port, workers=1)
@@ -0,0 +1,96 @@
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SpeculativeDrafts:
+    """Blog drafts generated in the background while an outline waits for review.
+
+    generate(state, cancelled) is the blog LLM call. Drafts are kept per thread
+    together with a fingerprint of the title, research notes, outline,
+    draft_model and style they were written from, so a draft is only used if
+    exactly that outline is approved for the same model and style.
+
+    A running future cannot be cancelled, so every draft also gets a
+    threading.Event that is set when the draft is replaced, discarded or
+    evicted. generate should check it while streaming and stop early (its
+    result is ignored), which ends the LLM call and frees the pool worker
+    instead of spending quota on a draft nobody will read.
+    """
+
+    def __init__(self, generate, max_workers=4, max_drafts=100):
+        self.generate = generate
+        self.max_drafts = max_drafts
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculative-draft")
+        self._drafts = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(state):
+        source = "\x00".join(
+            (
+                state["blog_title"], state["research_notes"], state["outline"], state.get("draft_model", ""),
+                state.get("tone") or "", state.get("target_words") or "",
+            )
+        )
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+    def start(self, thread_id, state):
+        """Start drafting from state unless a draft of the same outline is already under way"""
+        fingerprint = self.fingerprint(state)
+        with self._lock:
+            current = self._drafts.get(thread_id)
+            if current is not None and current[0] == fingerprint:
+                return
+            if current is not None:
+                self._cancel(current)
+            cancelled = threading.Event()
+            self._drafts[thread_id] = (fingerprint, self._pool.submit(self.generate, dict(state), cancelled), cancelled)
+            self._drafts.move_to_end(thread_id)
+            # Reviews that are never answered must not pin drafts forever
+            while len(self._drafts) > self.max_drafts:
+                self._cancel(self._drafts.popitem(last=False)[1])
+
+    @staticmethod
+    def _cancel(entry):
+        entry[2].set()
+        entry[1].cancel()
+
+    def discard(self, thread_id):
+        """Drop the thread's draft and tell it to stop if it is already running"""
+        with self._lock:
+            entry = self._drafts.pop(thread_id, None)
+        if entry is not None:
+            self._cancel(entry)
+
+    def _pop_matching(self, thread_id, state):
+        with self._lock:
+            entry = self._drafts.pop(thread_id, None)
+        if entry is None:
+            return None
+        if entry[0] != self.fingerprint(state):
+            self._cancel(entry)
+            return None
+        return entry[1]
+
+    def take(self, thread_id, state):
+        """The draft for state's outline, waiting for it if still running; None if there is none"""
+        future = self._pop_matching(thread_id, state)
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception:
+            # A failed draft just means the post is generated the normal way
+            return None
+
+    async def atake(self, thread_id, state):
+        future = self._pop_matching(thread_id, state)
+        if future is None:
+            return None
+        try:
+            return await asyncio.wrap_future(future)
+        except Exception:
+            return None
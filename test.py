@@ -1,14 +1,18 @@
 from langgraph.types import Command 
-from graph import graph 
+from graph import stream_graph
 from langchain_core.messages import HumanMessage
 
 
+def print_token(node, text):
+    print(text, end="", flush=True)
+
+
 if __name__ == "__main__":
     # Create a thread config
     thread_config = {"configurable": {"thread_id": "blog_creation_thread"}}
     
     # Initial invocation - will run until interrupt
-    result = graph.invoke({
+    result = stream_graph({
         "messages": [HumanMessage(content="Write a blog about NVIDIA stock developments")],
         "blog_title": "",
         "research_notes": "",
@@ -16,7 +20,7 @@ if __name__ == "__main__":
         "blog_content": "",
         "approval": False,
         "feedback": ""
-    }, config=thread_config)
+    }, config=thread_config, on_token=print_token)
     
     # Check if we hit an interrupt (indicated by __interrupt__ key)
     if '__interrupt__' in result:
@@ -38,12 +42,13 @@ if __name__ == "__main__":
                 feedback = input("Please provide feedback for improvement: ").strip()
             
             # Resume with human decision
-            result = graph.invoke(
+            result = stream_graph(
                 Command(resume={
                     "approved": approved,
                     "feedback": feedback
                 }),
-                config=thread_config
+                config=thread_config,
+                on_token=print_token
             )
             
             # Check if we hit another interrupt (revision cycle)
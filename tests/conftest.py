@@ -0,0 +1,31 @@
+import os
+
+# Offline like bench.py: no response cache, research store, quota or metrics files, dummy keys for client setup.
+# Set before anything imports graph, which reads its settings at import time.
+os.environ.setdefault("LLM_CACHE", "0")
+os.environ.setdefault("RESEARCH_STORE", "")
+os.environ.setdefault("LLM_REQUESTS_PER_MINUTE", "0")
+os.environ.setdefault("LLM_TOKENS_PER_MINUTE", "0")
+os.environ.setdefault("METRICS_LOG", "")
+os.environ.setdefault("METRICS_PROM_PATH", "")
+os.environ.setdefault("CHECKPOINT_DB", "")
+os.environ.setdefault("GROQ_API_KEY", "offline-tests")
+os.environ.setdefault("TAVILY_API_KEY", "offline-tests")
+
+import pytest
+
+from fakes import FakeChatModel, FakeSearch
+
+
+@pytest.fixture(scope="session")
+def fake_graph():
+    """The graph module running on fast deterministic fakes instead of Groq and Tavily"""
+    import graph
+
+    search = FakeSearch(latency_ms=1.0)
+    graph.use_backends(
+        chat=FakeChatModel(first_token_ms=1.0, per_token_ms=0.0, output_tokens=60),
+        search=search,
+        async_search=search.asearch,
+    )
+    return graph
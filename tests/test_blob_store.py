@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import uuid
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.types import Command, Interrupt, Send
+
+from blob_store import BLOB_KEY, BlobSerializer, BlobStore
+from checkpointing import collect_blobs, make_async_checkpointer, make_checkpointer
+
+BIG = "research " * 400
+
+
+def test_serializer_round_trip_moves_large_values_out():
+    serde = BlobSerializer(BlobStore(), min_bytes=1024)
+    value = {
+        "notes": BIG,
+        "title": "short",
+        "messages": [HumanMessage(content=BIG, id="m1"), AIMessage(content="ok", id="m2")],
+        "pair": [BIG, 1],
+        "interrupt": Interrupt(value={"outline": BIG}, id="i1"),
+        "send": Send("section_writer", {"section": BIG}),
+    }
+    type_, data = serde.dumps_typed(value)
+    assert len(data) < len(BIG)
+    assert serde.loads_typed((type_, data)) == value
+    # The string is stored once wherever it appears, the large message once more
+    assert serde.store.stats()["blobs"] == 2
+    assert len(serde.references((type_, data))) == 2
+
+def test_repeated_values_are_stored_once(tmp_path):
+    serde = BlobSerializer(BlobStore(str(tmp_path / "blobs.sqlite")), min_bytes=1024)
+    first = serde.dumps_typed({"notes": BIG, "outline": "a"})
+    second = serde.dumps_typed({"notes": BIG, "outline": "b"})
+    assert serde.references(first) == serde.references(second)
+    assert serde.store.stats()["blobs"] == 1
+
+def test_blobs_of_one_value_are_written_in_one_transaction(tmp_path, monkeypatch):
+    serde = BlobSerializer(BlobStore(str(tmp_path / "blobs.sqlite")), min_bytes=1024)
+    batches = []
+    put_many = serde.store.put_many
+    monkeypatch.setattr(serde.store, "put_many", lambda blobs: batches.append(len(blobs)) or put_many(blobs))
+    serde.dumps_typed({"notes": BIG, "outline": "outline " * 400, "messages": [HumanMessage(content=BIG, id="m1")]})
+    assert batches == [3]
+    assert serde.store.stats()["blobs"] == 3
+
+def test_small_values_stay_inline():
+    serde = BlobSerializer(BlobStore(), min_bytes=1024)
+    type_, data = serde.dumps_typed({"title": "short"})
+    assert BLOB_KEY.encode() not in data
+    assert serde.store.stats()["blobs"] == 0
+
+def test_collect_spares_referenced_and_recent_blobs():
+    store = BlobStore()
+    keep, drop, recent = store.put("json", b"keep"), store.put("json", b"drop"), store.put("json", b"recent")
+    store._created[keep] -= 3600
+    store._created[drop] -= 3600
+    assert store.collect({keep}, grace_seconds=600) == 1
+    assert store.get(keep) and store.get(recent)
+    assert store.stats()["blobs"] == 2
+
+def test_reused_blob_survives_collect_from_another_process(tmp_path):
+    path = str(tmp_path / "blobs.sqlite")
+    store = BlobStore(path)
+    digest = store.put("json", b"payload")
+    # Stored long ago, then reused by a checkpoint that is still being written
+    store._conn.execute("UPDATE checkpoint_blobs SET created_at = created_at - 3600")
+    store._conn.commit()
+    assert store.put("json", b"payload") == digest
+
+    assert BlobStore(path).collect(set(), grace_seconds=600) == 0
+    assert BlobStore(path).get(digest) == ("json", b"payload")
+
+def test_reuse_writes_back_a_blob_deleted_elsewhere(tmp_path):
+    path = str(tmp_path / "blobs.sqlite")
+    store = BlobStore(path)
+    digest = store.put("json", b"payload")
+    assert BlobStore(path).collect(set(), grace_seconds=0) == 1
+    store.put("json", b"payload")
+    assert BlobStore(path).get(digest) == ("json", b"payload")
+
+def test_collect_blobs_after_a_thread_is_deleted(fake_graph, tmp_path):
+    saver = make_checkpointer(str(tmp_path / "checkpoints.sqlite"))
+    graph = fake_graph.graph_builder.compile(checkpointer=saver)
+    config = {"configurable": {"thread_id": f"blobs-{uuid.uuid4().hex[:8]}"}}
+    graph.invoke(fake_graph.new_blog_input("solar power"), config)
+    graph.invoke(Command(resume={"approved": True}), config)
+    stored = saver.serde.store.stats()["blobs"]
+    assert stored > 0
+
+    # Everything is still referenced
+    assert collect_blobs(saver, grace_seconds=0) == 0
+    reopened = fake_graph.graph_builder.compile(checkpointer=saver)
+    assert reopened.get_state(config).values["blog_content"]
+
+    saver.delete_thread(config["configurable"]["thread_id"])
+    assert collect_blobs(saver, grace_seconds=0) == stored
+    assert saver.serde.store.stats()["blobs"] == 0
+
+def test_async_saver_writes_blobs_off_the_event_loop(fake_graph, tmp_path, monkeypatch):
+    threads = []
+
+    async def run():
+        saver = await make_async_checkpointer(str(tmp_path / "checkpoints.sqlite"))
+        put_many = saver.serde.store.put_many
+        monkeypatch.setattr(
+            saver.serde.store, "put_many", lambda blobs: threads.append(threading.get_ident()) or put_many(blobs)
+        )
+        graph = fake_graph.graph_builder.compile(checkpointer=saver)
+        config = {"configurable": {"thread_id": f"async-blobs-{uuid.uuid4().hex[:8]}"}}
+        try:
+            await graph.ainvoke(fake_graph.new_blog_input("solar power"), config)
+            await graph.ainvoke(Command(resume={"approved": True}), config)
+            assert (await graph.aget_state(config)).values["blog_content"]
+        finally:
+            await saver.conn.close()
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert threads
+    assert loop_thread not in threads
+
+class GrowingDict(dict):
+    """Dict that gains an entry while it is iterated, as when the graph writes during collect_blobs"""
+
+    def values(self):
+        values = iter(super().values())
+        first = next(values)
+        self[object()] = {}
+        yield first
+        yield from values
+
+def test_collect_blobs_while_a_memory_saver_is_written(fake_graph):
+    saver = make_checkpointer("")
+    graph = fake_graph.graph_builder.compile(checkpointer=saver)
+    graph.invoke(fake_graph.new_blog_input("solar power"), {"configurable": {"thread_id": "memory-blobs"}})
+    saver.writes = GrowingDict(saver.writes)
+    assert len(saver.writes) > 1
+    assert collect_blobs(saver) == 0
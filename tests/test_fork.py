@@ -0,0 +1,76 @@
+import uuid
+
+import pytest
+from langgraph.types import Command
+
+from fork import parse_variant
+
+
+def finished_thread(graph):
+    """A thread run to completion with an approved outline"""
+    config = {"configurable": {"thread_id": f"t-{uuid.uuid4().hex[:8]}"}}
+    graph.get_graph().invoke(graph.new_blog_input("solar power"), config)
+    graph.get_graph().invoke(Command(resume={"approved": True}), config)
+    return config["configurable"]["thread_id"]
+
+def nodes_run(graph, config):
+    """Nodes that ran in a thread, oldest first"""
+    history = list(graph.get_graph().get_state_history(config))
+    return [node for snapshot in reversed(history[1:]) for node in snapshot.next]
+
+def test_fork_reuses_upstream_state_and_runs_only_the_writer(fake_graph):
+    source = finished_thread(fake_graph)
+    calls = fake_graph.search_cache.stats()["misses"]
+
+    config = fake_graph.fork_thread(source, {"tone": "witty", "target_words": " 1500 - 2000 "})
+    result = fake_graph.get_graph().invoke(None, config)
+
+    original = fake_graph.get_graph().get_state({"configurable": {"thread_id": source}}).values
+    assert result["tone"] == "witty"
+    assert result["target_words"] == "1500-2000"
+    assert result["outline"] == original["outline"]
+    assert result["research_notes"] == original["research_notes"]
+    assert result["blog_content"]
+    assert nodes_run(fake_graph, {"configurable": {"thread_id": config["configurable"]["thread_id"]}}) == ["blog_generator"]
+    assert fake_graph.search_cache.stats()["misses"] == calls
+
+def test_fork_of_a_fork(fake_graph):
+    source = finished_thread(fake_graph)
+    first = fake_graph.fork_thread(source, {"tone": "witty"})
+    fake_graph.get_graph().invoke(None, first)
+
+    second = fake_graph.fork_thread(first["configurable"]["thread_id"], {"target_words": "300"})
+    result = fake_graph.get_graph().invoke(None, second)
+    assert result["tone"] == "witty"
+    assert result["target_words"] == "300"
+    assert result["blog_content"]
+
+def test_fork_of_an_unfinished_fork(fake_graph):
+    first = fake_graph.fork_thread(finished_thread(fake_graph), {"tone": "witty"})
+    # Not run yet: its only checkpoint is the copied state
+    second = fake_graph.fork_thread(first["configurable"]["thread_id"], {"tone": "dry"})
+    assert fake_graph.get_graph().invoke(None, second)["tone"] == "dry"
+
+def test_fork_before_review_needs_a_thread_that_reached_it(fake_graph):
+    with pytest.raises(ValueError, match="has no checkpoint before"):
+        fake_graph.fork_thread("no-such-thread", {"tone": "witty"})
+
+@pytest.mark.parametrize("values", [
+    {"outline": ""},
+    {"messages": "x"},
+    {"target_words": "abc"},
+    {"target_words": "0"},
+    {"target_words": "2000-1500"},
+    {"tone": "  "},
+])
+def test_fork_rejects_invalid_values(fake_graph, values):
+    source = finished_thread(fake_graph)
+    with pytest.raises(ValueError):
+        fake_graph.fork_thread(source, values)
+
+def test_parse_variant():
+    assert parse_variant("tone=witty; target_words=1500-2000") == {"tone": "witty", "target_words": "1500-2000"}
+    assert parse_variant("target_words=900") == {"target_words": "900"}
+    for spec in ("tone", "outline=", "messages=x", "target_words=abc"):
+        with pytest.raises(ValueError):
+            parse_variant(spec)
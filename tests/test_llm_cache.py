@@ -0,0 +1,52 @@
+import types
+
+import pytest
+from langchain_core.outputs import Generation
+
+import llm_cache
+from llm_cache import SQLiteLRUCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Manually advanced replacement for time.time() inside llm_cache"""
+    now = types.SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(llm_cache, "time", types.SimpleNamespace(time=lambda: now.value))
+    return now
+
+def store(cache, prompt, clock):
+    clock.value += 1
+    cache.update(prompt, "model", [Generation(text=f"reply to {prompt}")])
+
+def test_hit_returns_stored_generations(tmp_path, clock):
+    cache = SQLiteLRUCache(str(tmp_path / "cache.sqlite"))
+    store(cache, "a", clock)
+    assert cache.lookup("a", "model")[0].text == "reply to a"
+    assert cache.lookup("a", "other model") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1}
+
+def test_evicts_least_recently_used_beyond_max_entries(tmp_path, clock):
+    cache = SQLiteLRUCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    store(cache, "a", clock)
+    store(cache, "b", clock)
+    clock.value += 1
+    # Reading "a" makes "b" the least recently used entry
+    assert cache.lookup("a", "model") is not None
+    store(cache, "c", clock)
+
+    assert cache.stats()["entries"] == 2
+    assert cache.lookup("b", "model") is None
+    assert cache.lookup("a", "model") is not None
+    assert cache.lookup("c", "model") is not None
+
+def test_expired_entries_are_dropped(tmp_path, clock):
+    cache = SQLiteLRUCache(str(tmp_path / "cache.sqlite"), ttl_seconds=60)
+    store(cache, "a", clock)
+    clock.value += 61
+    assert cache.lookup("a", "model") is None
+    assert cache.stats()["entries"] == 0
+
+def test_entries_survive_reopening(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+    store(SQLiteLRUCache(path), "a", clock)
+    assert SQLiteLRUCache(path).lookup("a", "model")[0].text == "reply to a"
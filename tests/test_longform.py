@@ -0,0 +1,59 @@
+import asyncio
+import re
+
+import pytest
+
+
+@pytest.fixture
+def longform(fake_graph, tmp_path, monkeypatch):
+    monkeypatch.setattr(fake_graph, "LONGFORM_DIR", str(tmp_path))
+    monkeypatch.setattr(fake_graph, "LONGFORM_PART_WORDS", 500)
+    return fake_graph
+
+def approved_state(target_words="6000"):
+    outline = "\n\n".join(f"## {i}. Part {i}\n- point one\n- point two" for i in range(1, 5))
+    return {
+        "blog_title": "Solar power",
+        "research_notes": "Panels got cheaper.",
+        "outline": outline,
+        "target_words": target_words,
+        "tone": "plain",
+    }
+
+def test_plan_splits_sections_into_bounded_parts(longform):
+    sections, plan = longform.longform_plan(approved_state("6000"))
+    assert len(sections) == 4
+    # 1500 words per section in parts of at most 500
+    assert plan[:3] == [(0, 0, 3, 500), (0, 1, 3, 500), (0, 2, 3, 500)]
+    assert len(plan) == 12
+
+def test_prompts_stay_bounded_as_the_document_grows(longform):
+    steps = longform.longform_steps(approved_state("20000"))
+    sizes, reply = {"part": [], "summary": []}, None
+    try:
+        while True:
+            kind, prompt = steps.send(reply)
+            sizes[kind].append(len(prompt))
+            # Long replies every time; only what is carried between parts could make prompts grow
+            reply = "word " * (longform.LONGFORM_PART_WORDS if kind == "part" else 1000)
+    except StopIteration as done:
+        sections, words = done.value
+    assert len(sizes["part"]) == 40 and len(sizes["summary"]) == 39
+    assert words == 40 * longform.LONGFORM_PART_WORDS
+    assert max(sizes["part"][1:]) - min(sizes["part"][1:]) < 200
+    assert max(sizes["summary"][1:]) - min(sizes["summary"][1:]) < 200
+
+def test_sync_and_async_writers_stream_the_same_file(longform, tmp_path):
+    state = approved_state("2000")
+    update = longform.longform_writer(state, {"configurable": {"thread_id": "doc/1"}})
+    path = tmp_path / "doc_1.md"
+    assert update["output_path"] == str(path)
+    assert str(path) in update["blog_content"]
+    words = int(re.search(r"about ([\d,]+) words", update["blog_content"])[1].replace(",", ""))
+    text = path.read_text()
+    assert text.startswith("# Solar power\n\n")
+    assert len(text.split()) == words + 3
+
+    aupdate = asyncio.run(longform.alongform_writer(state, {"configurable": {"thread_id": "doc-2"}}))
+    assert (tmp_path / "doc-2.md").read_text() == text
+    assert aupdate["blog_content"] == update["blog_content"].replace("doc_1", "doc-2")
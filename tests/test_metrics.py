@@ -0,0 +1,46 @@
+import json
+import uuid
+
+from metrics import GraphMetrics
+
+
+def finish_node(metrics, thread_id, node):
+    run_id = uuid.uuid4()
+    metrics.on_chain_start({}, {}, run_id=run_id, name=node, metadata={"thread_id": thread_id, "langgraph_node": node})
+    metrics.on_chain_end({}, run_id=run_id)
+
+def test_nothing_is_written_until_flushed(tmp_path):
+    log, prom = tmp_path / "metrics.jsonl", tmp_path / "metrics.prom"
+    metrics = GraphMetrics(log_path=str(log), prom_path=str(prom), export_seconds=3600)
+    finish_node(metrics, "t1", "outline_generator")
+    assert not log.exists() and not prom.exists()
+
+    metrics.flush()
+    events = [json.loads(line) for line in log.read_text().splitlines()]
+    assert [(e["thread_id"], e["node"], e["status"]) for e in events] == [("t1", "outline_generator", "ok")]
+    assert 'blog_node_runs_total{thread_id="t1",node="outline_generator"} 1' in prom.read_text()
+
+def test_event_log_is_off_by_default(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    metrics = GraphMetrics(prom_path="")
+    finish_node(metrics, "t1", "outline_generator")
+    metrics.flush()
+    assert list(tmp_path.iterdir()) == []
+
+def test_event_log_is_rotated_by_size(tmp_path):
+    log = tmp_path / "metrics.jsonl"
+    metrics = GraphMetrics(log_path=str(log), prom_path="", export_seconds=3600, log_max_bytes=200)
+    for _ in range(3):
+        finish_node(metrics, "t1", "outline_generator")
+        metrics.flush()
+    assert (tmp_path / "metrics.jsonl.1").exists()
+    assert len(log.read_text().splitlines()) == 1
+
+def test_totals_are_typed_as_counters():
+    metrics = GraphMetrics(log_path="", prom_path="")
+    metrics.gauges.append(lambda: {"blog_queue_depth": ("Waiting requests", 2), "blog_granted_total": ("Granted", 5)})
+    finish_node(metrics, "t1", "outline_generator")
+    text = metrics.prometheus()
+    assert "# TYPE blog_granted_total counter" in text
+    assert "# TYPE blog_queue_depth gauge" in text
+    assert "# TYPE blog_node_runs_total counter" in text
@@ -0,0 +1,67 @@
+from outline import feedback_targets, parse_sections, replace_sections
+
+MARKDOWN = """# Blog Title: Solar Power
+
+## Introduction
+- Why solar matters
+
+## Costs and Prices
+- Panel prices
+  - Since 2010
+
+## Risks
+- Grid limits
+"""
+
+NUMBERED = """Blog Outline: Solar Power
+
+1. Introduction
+   - Why solar matters
+2. Costs and Prices
+   - Panel prices
+3. Risks
+   - Grid limits
+"""
+
+
+def test_parse_markdown_outline_drops_the_title():
+    sections = parse_sections(MARKDOWN)
+    assert [section["heading"] for section in sections] == ["Introduction", "Costs and Prices", "Risks"]
+    assert sections[1]["body"] == "## Costs and Prices\n- Panel prices\n  - Since 2010"
+
+def test_parse_numbered_outline_keeps_nested_bullets_in_their_section():
+    sections = parse_sections(NUMBERED)
+    assert [section["heading"] for section in sections] == ["1. Introduction", "2. Costs and Prices", "3. Risks"]
+    assert sections[2]["body"] == "3. Risks\n   - Grid limits"
+
+def test_unstructured_outline_has_no_sections():
+    assert parse_sections("Just a paragraph about solar power.") == []
+    assert parse_sections("") == []
+
+def test_feedback_naming_a_section_targets_it():
+    sections = parse_sections(MARKDOWN)
+    assert feedback_targets(sections, "The risks part needs more depth") == [2]
+    assert feedback_targets(sections, "Section 2 needs more data") == [1]
+
+def test_structural_or_vague_feedback_revises_everything():
+    sections = parse_sections(MARKDOWN)
+    assert feedback_targets(sections, "Add a section on storage") is None
+    assert feedback_targets(sections, "Reorder the points") is None
+    assert feedback_targets(sections, "Make it punchier") is None
+    assert feedback_targets(sections, "   ") is None
+    # A single section leaves nothing to keep
+    assert feedback_targets(sections[:1], "Introduction is thin") is None
+
+def test_replace_sections_swaps_only_the_targeted_body():
+    sections = parse_sections(MARKDOWN)
+    revised = replace_sections(MARKDOWN, sections, {2: "## Risks\n- Grid limits\n- Storage costs"})
+    assert revised == MARKDOWN.replace("- Grid limits\n", "- Grid limits\n- Storage costs\n")
+
+def test_replace_sections_puts_back_a_missing_heading_line():
+    sections = parse_sections(NUMBERED)
+    revised = replace_sections(NUMBERED, sections, {0: "   - Why solar matters now"})
+    assert "1. Introduction\n- Why solar matters now\n2. Costs and Prices" in revised
+
+def test_replace_sections_gives_up_when_a_body_is_not_found():
+    sections = parse_sections(MARKDOWN)
+    assert replace_sections(MARKDOWN.replace("Grid limits", "Grid"), sections, {2: "## Risks\n- x"}) is None
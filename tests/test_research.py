@@ -0,0 +1,34 @@
+from research import dedupe_and_rank
+
+
+def test_repeated_url_ranks_first():
+    ranked = dedupe_and_rank([
+        [{"url": "https://example.com/a", "content": "first page", "score": 0.5},
+         {"url": "https://example.com/b", "content": "second page", "score": 0.9}],
+        [{"url": "http://www.example.com/a/", "content": "first page again", "score": 0.7}],
+    ])
+    assert [r["url"] for r in ranked] == ["https://example.com/a", "https://example.com/b"]
+    assert ranked[0]["hits"] == 2
+    assert ranked[0]["score"] == 0.7
+
+def test_same_content_on_different_urls_is_merged():
+    ranked = dedupe_and_rank([
+        [{"url": "https://example.com/a", "content": "Same  Text"}],
+        [{"url": "https://mirror.example.org/a", "content": "same text"}],
+    ])
+    assert len(ranked) == 1
+    assert ranked[0]["hits"] == 2
+
+def test_results_without_content_are_kept_per_url():
+    ranked = dedupe_and_rank([
+        [{"url": "https://example.com/a", "content": ""},
+         {"url": "https://example.com/b", "content": "  "},
+         {"url": "https://example.com/c"}],
+        [{"url": "https://example.com/a", "content": None}],
+    ])
+    assert sorted(r["url"] for r in ranked) == ["https://example.com/a", "https://example.com/b", "https://example.com/c"]
+    assert {r["url"]: r["hits"] for r in ranked}["https://example.com/a"] == 2
+
+def test_limit():
+    results = [{"url": f"https://example.com/{i}", "content": f"page {i}", "score": i / 10} for i in range(10)]
+    assert [r["url"] for r in dedupe_and_rank([results], limit=3)] == [f"https://example.com/{i}" for i in (9, 8, 7)]
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+
+from langchain_core.messages import AIMessage
+
+
+def test_extraction_reduces_ranked_results_to_stubs(fake_graph):
+    state = {
+        "blog_title": "solar power",
+        "messages": [],
+        "research_results": [
+            {"title": "Panels", "url": "https://example.com/a", "content": "page text " * 500, "score": 0.9, "hits": 2},
+        ],
+    }
+    update = fake_graph.extracted_research(state, AIMessage(content="- notes"))
+    assert update["research_notes"] == "- notes"
+    assert update["research_results"] == [{"title": "Panels", "url": "https://example.com/a", "score": 0.9, "hits": 2}]
+
+def test_multi_mode_checkpoints_keep_no_page_text(fake_graph):
+    state = {"blog_title": "solar power", "messages": []}
+    state.update(fake_graph.multi_research(state))
+    assert all(result["content"] for result in state["research_results"])
+
+    update = fake_graph.extract_research(state)
+    assert update["research_results"]
+    assert all("content" not in result for result in update["research_results"])
+
+class RecordingStore:
+    """Research store stand-in that records which thread each call ran on"""
+
+    def __init__(self, threads):
+        self.threads = threads
+
+    def add_notes(self, topic, notes):
+        self.threads.append(("add_notes", threading.get_ident()))
+
+    async def asearch(self, query, max_results=3):
+        return []
+
+def test_async_path_keeps_store_io_off_the_event_loop(fake_graph, monkeypatch):
+    threads = []
+
+    def open_store():
+        threads.append(("open", threading.get_ident()))
+        return RecordingStore(threads)
+
+    monkeypatch.setattr(fake_graph, "RESEARCH_STORE_PATH", "research.sqlite")
+    monkeypatch.setattr(fake_graph, "_research_store", None)
+    monkeypatch.setattr(fake_graph, "get_research_store", open_store)
+
+    async def run():
+        await fake_graph.astored_search("solar power")
+        await fake_graph.aextract_research({"blog_title": "solar power", "messages": []})
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert [name for name, _ in threads] == ["open", "open", "add_notes"]
+    assert all(thread != loop_thread for _, thread in threads)
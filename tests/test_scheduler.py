@@ -0,0 +1,97 @@
+import asyncio
+import types
+
+import pytest
+from langchain_core.runnables.config import var_child_runnable_config
+
+from scheduler import LLMScheduler
+
+
+@pytest.fixture
+def clock():
+    """Manually advanced replacement for time.monotonic() inside the scheduler"""
+    now = types.SimpleNamespace(value=1000.0)
+    now.monotonic = lambda: now.value
+    return now
+
+def drained_scheduler(clock, **budgets):
+    """One request per millisecond of clock time, at most one at a time, with the burst already used up"""
+    scheduler = LLMScheduler(
+        requests_per_minute=60_000, burst_seconds=0.001, poll_seconds=0.001, clock=clock.monotonic, **budgets
+    )
+    scheduler.requests.take()
+    return scheduler
+
+async def waiter(scheduler, priority, granted):
+    # Graph runs pass their priority through the runnable config
+    var_child_runnable_config.set({"configurable": {"priority": priority}})
+    await scheduler.aacquire()
+    granted.append(priority)
+
+async def until(condition):
+    for _ in range(500):
+        if condition():
+            return
+        await asyncio.sleep(0.001)
+    raise AssertionError("condition not reached")
+
+def test_interactive_requests_are_granted_before_batch(clock):
+    scheduler = drained_scheduler(clock)
+
+    async def run():
+        granted = []
+        tasks = [asyncio.create_task(waiter(scheduler, priority, granted)) for priority in ("batch", "batch", "interactive")]
+        await until(lambda: sum(scheduler.stats()["queued"].values()) == 3)
+        # Nothing is let through until the clock frees a request
+        await asyncio.sleep(0.01)
+        assert granted == []
+        for count in (1, 2, 3):
+            clock.value += 0.002
+            await until(lambda: len(granted) == count)
+        await asyncio.gather(*tasks)
+        return granted
+
+    assert asyncio.run(run()) == ["interactive", "batch", "batch"]
+    assert scheduler.stats()["granted"] == 3
+
+def test_requests_wait_while_tokens_are_in_debt(clock):
+    scheduler = LLMScheduler(tokens_per_minute=600, burst_seconds=1, clock=clock.monotonic)
+    assert scheduler.acquire(blocking=False)
+    # 30 tokens against a 10-token bucket refilling 10 per second leaves it 20 in debt
+    scheduler.record_tokens(30)
+    assert not scheduler.acquire(blocking=False)
+    assert scheduler.stats()["next_slot_seconds"] == pytest.approx(2.1)
+    clock.value += 2.0
+    assert not scheduler.acquire(blocking=False)
+    clock.value += 0.2
+    assert scheduler.acquire(blocking=False)
+    assert scheduler.stats()["queued"] == {"interactive": 0, "batch": 0}
+
+def test_throttle_delays_grants(clock, monkeypatch):
+    monkeypatch.setattr("scheduler.random.uniform", lambda low, high: high)
+    scheduler = LLMScheduler(requests_per_minute=600, clock=clock.monotonic)
+    scheduler.throttle(retry_after=4)
+    # 4 seconds with the largest jitter
+    assert not scheduler.acquire(blocking=False)
+    clock.value += 4.9
+    assert not scheduler.acquire(blocking=False)
+    clock.value += 0.2
+    assert scheduler.acquire(blocking=False)
+    assert scheduler.stats()["throttled"] == 1
+
+def test_cancelled_async_waiter_leaves_the_queue(clock):
+    scheduler = drained_scheduler(clock)
+
+    async def run():
+        granted = []
+        task = asyncio.create_task(waiter(scheduler, "interactive", granted))
+        await until(lambda: scheduler.stats()["queued"]["interactive"] == 1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert scheduler.stats()["queued"]["interactive"] == 0
+        # A stale ticket at the head of the queue would block everyone behind it
+        clock.value += 0.002
+        return await scheduler.aacquire(blocking=False), granted
+
+    assert asyncio.run(run()) == (True, [])
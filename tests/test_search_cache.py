@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from research_store import ResearchStore
+from search_cache import SearchCache
+
+
+class SlowBackend:
+    """Search backend that blocks until released, counting upstream calls"""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __call__(self, query, max_results=3):
+        self.calls += 1
+        self.release.wait(5)
+        return [{"title": query, "url": f"https://example.com/{self.calls}/{i}", "content": f"{query} page {i}", "score": 1}
+                for i in range(max_results)]
+
+    async def asearch(self, query, max_results=3):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return [{"title": query, "url": f"https://example.com/{self.calls}/{i}", "content": f"{query} page {i}", "score": 1}
+                for i in range(max_results)]
+
+
+def test_concurrent_identical_queries_share_one_call():
+    backend = SlowBackend()
+    cache = SearchCache(backend)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(cache.search, query) for query in ("GPU prices", "gpu  prices?", "GPU prices", "Gpu Prices")]
+        # Let every caller reach the cache while the first search is still running
+        while cache.stats()["coalesced"] < 3:
+            threading.Event().wait(0.01)
+        backend.release.set()
+        results = [future.result() for future in futures]
+
+    assert backend.calls == 1
+    assert all(result == results[0] for result in results)
+    assert cache.stats() == {"hits": 0, "misses": 1, "coalesced": 3, "entries": 1}
+
+def test_concurrent_async_queries_share_one_call():
+    backend = SlowBackend()
+    cache = SearchCache(backend, backend.asearch)
+
+    async def run():
+        return await asyncio.gather(*(cache.asearch("GPU prices") for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert backend.calls == 1
+    assert all(result == results[0] for result in results)
+    assert cache.stats()["coalesced"] == 4
+
+def test_failed_search_is_not_cached():
+    calls = []
+
+    def failing(query, max_results=3):
+        calls.append(query)
+        raise RuntimeError("upstream down")
+
+    cache = SearchCache(failing)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            cache.search("GPU prices")
+    assert len(calls) == 2
+
+def test_results_expire_after_ttl():
+    backend = SlowBackend()
+    backend.release.set()
+    now = types.SimpleNamespace(value=0.0)
+    cache = SearchCache(backend, ttl_seconds=60, clock=lambda: now.value)
+
+    first = cache.search("GPU prices")
+    now.value = 59
+    assert cache.search("gpu prices") is first
+    now.value = 121
+    cache.search("GPU prices")
+    assert backend.calls == 2
+    assert cache.stats()["hits"] == 1
+
+def test_listeners_hear_hits_and_misses():
+    backend = SlowBackend()
+    backend.release.set()
+    cache = SearchCache(backend)
+    heard = []
+    cache.listeners.append(heard.append)
+    cache.search("GPU prices")
+    cache.search("GPU prices")
+    assert heard == [False, True]
+
+def test_research_store_answers_covered_queries_without_the_web(tmp_path):
+    backend = SlowBackend()
+    backend.release.set()
+    store = ResearchStore(str(tmp_path / "research.sqlite"), backend)
+
+    fetched = store.search("nvidia gpu prices")
+    # A later search whose significant words all appear in stored documents stays local
+    assert ResearchStore(str(tmp_path / "research.sqlite"), backend).search("the nvidia prices") == fetched
+    assert backend.calls == 1
+    store.search("amd cpu prices")
+    assert backend.calls == 2
+
+def test_research_store_ignores_stale_results(tmp_path):
+    backend = SlowBackend()
+    backend.release.set()
+    store = ResearchStore(str(tmp_path / "research.sqlite"), backend, max_age_seconds=60)
+    store.search("nvidia gpu prices")
+    store._conn.execute("UPDATE documents SET fetched_at = fetched_at - 120")
+    store.search("nvidia gpu prices")
+    assert backend.calls == 2
+    assert store.stats()["misses"] == 2
+
+def test_research_store_notes_are_searchable(tmp_path):
+    store = ResearchStore(str(tmp_path / "research.sqlite"))
+    store.add_notes("NVIDIA earnings", "Data center revenue grew strongly.")
+    assert [d["topic"] for d in store.lookup("data center revenue", kind="notes")] == ["NVIDIA earnings"]
+    assert store.lookup("data center revenue") == []
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import uuid
+
+import httpx
+import pytest
+from starlette.testclient import TestClient
+
+import server
+
+
+@pytest.fixture
+def client(fake_graph):
+    with TestClient(server.app) as client:
+        yield client
+
+def read_events(client, thread_id):
+    """(event, data) pairs of the thread's SSE stream until the server ends it"""
+    events, event = [], None
+    with client.stream("GET", f"/threads/{thread_id}/stream") as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        for line in response.iter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                events.append((event, json.loads(line[len("data: "):])))
+    return events
+
+def test_create_review_resume_and_stream(client):
+    response = client.post("/threads", json={"topic": "solar power", "thread_id": "server-1"})
+    assert response.status_code == 202
+    assert response.json() == {"thread_id": "server-1", "status": "running"}
+
+    events = read_events(client, "server-1")
+    kinds = [event for event, _ in events]
+    assert {"name": "outline_generator", "status": "finished"} in [data for event, data in events if event == "node"]
+    assert "token" in kinds
+    assert kinds[-1] == "interrupt"
+    assert events[-1][1]["thread_id"] == "server-1"
+    assert events[-1][1]["outline"]
+
+    state = client.get("/threads/server-1").json()
+    assert state["status"] == "waiting"
+    assert state["review"]["question"] == "Do you approve this outline?"
+
+    assert client.post("/threads/server-1/resume", json={"approved": True}).status_code == 202
+    events = read_events(client, "server-1")
+    assert events[-1][0] == "done"
+    assert events[-1][1]["blog_content"]
+
+    state = client.get("/threads/server-1").json()
+    assert state["status"] == "complete"
+    assert state["review"] is None
+    # A finished thread's stream replays its result and ends
+    assert read_events(client, "server-1")[-1][0] == "done"
+
+def test_request_errors(client):
+    assert client.post("/threads", content="not json").status_code == 400
+    assert client.post("/threads", json={"topic": "  "}).status_code == 400
+    assert client.get("/threads/missing").status_code == 404
+    assert client.get("/threads/missing/stream").status_code == 404
+    assert client.post("/threads/missing/resume", json={"approved": True}).status_code == 404
+    assert client.post("/threads/missing/resume", json={"approved": "yes"}).status_code == 400
+
+    client.post("/threads", json={"topic": "wind power", "thread_id": "server-2"})
+    read_events(client, "server-2")
+    assert client.post("/threads", json={"topic": "wind power", "thread_id": "server-2"}).status_code == 409
+    client.post("/threads/server-2/resume", json={"approved": True})
+    read_events(client, "server-2")
+    assert client.post("/threads/server-2/resume", json={"approved": True}).status_code == 409
+
+def test_failed_thread_streams_an_error(client, fake_graph, monkeypatch):
+    def failing_search(query, max_results=3):
+        raise RuntimeError("search is down")
+
+    async def afailing_search(query, max_results=3):
+        failing_search(query, max_results)
+
+    monkeypatch.setattr(fake_graph.search_cache, "backend", failing_search)
+    monkeypatch.setattr(fake_graph.search_cache, "async_backend", afailing_search)
+    client.post("/threads", json={"topic": "tidal power outage", "thread_id": "server-failing"})
+    assert read_events(client, "server-failing")[-1][0] == "error"
+
+    assert client.get("/threads/server-failing").json()["status"] == "stopped"
+    # A stream opened after the run failed must not report the thread as done
+    event, data = read_events(client, "server-failing")[-1]
+    assert event == "error"
+    assert data["type"] == "stopped"
+
+def test_event_buffer_drops_tokens_before_other_events(monkeypatch):
+    monkeypatch.setattr(server, "SERVER_EVENT_BUFFER", 3)
+    run = server.ThreadRun("server-buffer")
+    run.on_task({"name": "blog_generator", "input": {}})
+    for text in ("a", "b", "c"):
+        run.on_token("blog_generator", text)
+    run.publish("done", {"thread_id": "server-buffer"})
+    assert [event for event, _ in run.events] == ["node", "token", "done"]
+    assert run.events[1][1]["text"] == "c"
+
+def test_concurrent_requests_start_one_run(fake_graph, monkeypatch):
+    thread_id = f"race-{uuid.uuid4().hex[:8]}"
+    thread_state = server.thread_state
+
+    async def yielding_thread_state(thread_id):
+        # The in-memory checkpointer answers without suspending; SQLite's async saver does not
+        await asyncio.sleep(0.01)
+        return await thread_state(thread_id)
+
+    monkeypatch.setattr(server, "thread_state", yielding_thread_state)
+
+    async def race():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            creates = await asyncio.gather(*(
+                client.post("/threads", json={"topic": "tidal power", "thread_id": thread_id}) for _ in range(5)
+            ))
+            await server.runs[thread_id].task
+            resumes = await asyncio.gather(*(
+                client.post(f"/threads/{thread_id}/resume", json={"approved": True}) for _ in range(5)
+            ))
+            await server.runs[thread_id].task
+            return [r.status_code for r in creates], [r.status_code for r in resumes]
+
+    creates, resumes = asyncio.run(race())
+    assert sorted(creates) == [202, 409, 409, 409, 409]
+    assert sorted(resumes) == [202, 409, 409, 409, 409]
+
+def test_finished_run_leaves_a_newer_run_registered():
+    older, newer = server.ThreadRun("server-3"), server.ThreadRun("server-3")
+    server.runs["server-3"] = newer
+    try:
+        older.close()
+        assert server.runs["server-3"] is newer
+        newer.close()
+        assert "server-3" not in server.runs
+    finally:
+        server.runs.pop("server-3", None)
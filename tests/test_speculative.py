@@ -0,0 +1,53 @@
+import threading
+
+from speculative import SpeculativeDrafts
+
+
+def draft_state(outline="## 1. Intro"):
+    return {"blog_title": "Solar power", "research_notes": "Panels got cheaper.", "outline": outline}
+
+def test_discard_stops_a_running_draft_and_frees_the_worker():
+    started, stopped = threading.Event(), threading.Event()
+
+    def generate(state, cancelled):
+        started.set()
+        # Stands in for a streamed LLM call that checks the flag between chunks
+        while not cancelled.wait(0.01):
+            pass
+        stopped.set()
+        return None
+
+    drafts = SpeculativeDrafts(generate, max_workers=1)
+    drafts.start("t1", draft_state())
+    assert started.wait(1)
+    drafts.discard("t1")
+    assert stopped.wait(1)
+
+    # The only worker is free again, so the next draft runs straight away
+    drafts.generate = lambda state, cancelled: state["outline"]
+    drafts.start("t2", draft_state("## 1. Other"))
+    assert drafts.take("t2", draft_state("## 1. Other")) == "## 1. Other"
+
+def test_new_outline_cancels_the_stale_draft():
+    flags, running = [], threading.Event()
+
+    def generate(state, cancelled):
+        flags.append(cancelled)
+        running.set()
+        return state["outline"]
+
+    drafts = SpeculativeDrafts(generate, max_workers=1)
+    drafts.start("t1", draft_state("## 1. First"))
+    assert running.wait(1)
+    drafts.start("t1", draft_state("## 1. Second"))
+    assert drafts.take("t1", draft_state("## 1. Second")) == "## 1. Second"
+    assert flags[0].is_set() and not flags[1].is_set()
+
+def test_stream_stops_once_the_draft_is_cancelled(fake_graph):
+    cancelled = threading.Event()
+    cancelled.set()
+    state = {**draft_state(), "draft_model": fake_graph.model_for("blog_generator")}
+    assert fake_graph.speculative_draft(state, cancelled) is None
+
+    message = fake_graph.speculative_draft(state, threading.Event())
+    assert message.content and type(message).__name__ == "AIMessage"
@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importing_entry_points_opens_no_sqlite_files(tmp_path):
+    # Every store configured, so an import that compiles the graph or opens a store leaves a file behind
+    env = {
+        **os.environ, "PYTHONPATH": ROOT, "LLM_CACHE": "1", "METRICS_PROM_PATH": "",
+        "RESEARCH_STORE": "research.sqlite", "CHECKPOINT_DB": "checkpoints.sqlite",
+    }
+    subprocess.run(
+        [sys.executable, "-c", "import graph, batch, fork, server, bench"], cwd=tmp_path, env=env, check=True, timeout=120
+    )
+    assert [str(path.relative_to(tmp_path)) for path in tmp_path.rglob("*") if path.is_file()] == []
+
+def test_stores_open_on_first_use(tmp_path):
+    env = {**os.environ, "PYTHONPATH": ROOT, "LLM_CACHE": "1", "RESEARCH_STORE": "store/research.sqlite"}
+    subprocess.run(
+        [sys.executable, "-c", "import graph; graph.get_llm_cache(); graph.get_research_store()"],
+        cwd=tmp_path, env={**env, "LLM_CACHE_PATH": "store/llm.sqlite"}, check=True, timeout=120,
+    )
+    assert sorted(path.name for path in (tmp_path / "store").iterdir()) == ["llm.sqlite", "research.sqlite"]